@@ -0,0 +1,69 @@
+"""Cold-start benchmark of the CLI modules.
+
+Every sample imports a module in a fresh interpreter, the way a short run starts. The
+median wall-clock time is compared to a target, and the run fails when it is over:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --module src.inventory_builder --target 0.6
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+import click
+
+
+HEAVY_MODULES = ["benchling_sdk", "boto3"]
+
+
+def sample(module: str, runs: int) -> List[float]:
+    "Seconds to start an interpreter and import module, once per run"
+
+    seconds = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+        seconds.append(time.perf_counter() - started)
+    return seconds
+
+
+def heavy_imports(module: str) -> List[str]:
+    "Heavy modules that importing module loads, should be none for the CLI modules"
+
+    check = (
+        f"import sys, {module}; "
+        f"print(' '.join(e for e in {HEAVY_MODULES!r} if e in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", check], check=True, capture_output=True, text=True
+    ).stdout
+    return output.split()
+
+
+@click.command()
+@click.option("--module", "modules", multiple=True, default=["src.offline", "src.inventory_builder"])
+@click.option("--runs", type=click.IntRange(min=1), default=10, show_default=True)
+@click.option("--target", type=float, default=0.5, show_default=True, help="Median seconds.")
+def cli(modules, runs, target):
+    baseline = statistics.median(sample("sys", runs))
+    failed = False
+
+    for module in modules:
+        seconds = sample(module, runs)
+        median = statistics.median(seconds)
+        heavy = heavy_imports(module)
+        print(
+            f"{module}: median {median:.3f}s, max {max(seconds):.3f}s "
+            f"(interpreter alone {baseline:.3f}s), heavy imports: {heavy or 'none'}"
+        )
+        failed = failed or median > target or bool(heavy)
+
+    if failed:
+        raise SystemExit(f"Cold start over {target}s or heavy modules imported")
+
+
+if __name__ == "__main__":
+    cli()
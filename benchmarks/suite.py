@@ -0,0 +1,275 @@
+"""Benchmarks of hierarchy generation, csv output and API fan-out.
+
+Every case runs in a fresh interpreter so its peak RSS is its own:
+
+    write_levels     the write_* functions, fully materialized per level
+    write_to_csv     the same, appending every level to a CsvSink
+    iter_nodes_csv   the streaming path main uses, hierarchy.iter_nodes into a CsvSink
+    main             main() against standin.FakeBenchling with a fixed latency
+
+Results are saved as JSON, one file per version, and --compare prints the change of
+every case against an earlier file and fails on regressions:
+
+    python benchmarks/suite.py --label v0.2 --sizes 1e3,1e4,1e5,1e6
+    python benchmarks/suite.py --label dev --compare benchmarks/results/v0.2.json
+"""
+
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import hierarchy  # noqa: E402
+from src import settings  # noqa: E402
+
+
+# Configurations of roughly 10^3 to 10^6 shelves, racks, drawers and boxes
+SIZES = {
+    "1e3": dict(shelves=5, racks=4, drawers=4, boxes=10),
+    "1e4": dict(shelves=10, racks=10, drawers=5, boxes=18),
+    "1e5": dict(shelves=20, racks=10, drawers=10, boxes=50),
+    "1e6": dict(shelves=50, racks=20, drawers=10, boxes=100),
+}
+CASES = ["write_levels", "write_to_csv", "iter_nodes_csv", "main"]
+# Higher is better for these, lower for the others
+THROUGHPUT_METRICS = ["objects_per_second"]
+COMPARED_METRICS = ["objects_per_second", "peak_rss_mb", "p50_ms", "p99_ms"]
+
+
+def storage(size: str) -> settings.StorageConfig:
+    return settings.StorageConfig(
+        parent_barcode="BENCH-1",
+        parent_name="Benchmark freezer",
+        rack_prefix="R",
+        rack_in_full="Rack",
+        drawer_prefix="D",
+        drawer_in_full="Drawer",
+        box_dimension=1,
+        **SIZES[size],
+    )
+
+
+def peak_rss_mb() -> float:
+    "ru_maxrss is in kilobytes on Linux and in bytes on macOS"
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def write_levels(config: settings.StorageConfig, sink: Any = None) -> None:
+    from src import inventory_builder
+
+    shelf = inventory_builder.write_shelves(config.shelves, config.parent_barcode, sink=sink)
+    rack = inventory_builder.write_racks_or_canes(
+        config.shelves,
+        config.rack_prefix,
+        config.rack_in_full,
+        config.racks,
+        config.parent_barcode,
+        shelf.barcodes,
+        sink=sink,
+    )
+    drawer = inventory_builder.write_drawers_or_rows(
+        rack.barcodes, config.drawer_prefix, config.drawer_in_full, config.drawers, sink=sink
+    )
+    inventory_builder.write_boxes(config.boxes, drawer.barcodes, sink=sink)
+
+
+def timed_client(client: Any, latencies: List[float]) -> Any:
+    "Record the seconds of every create call made through the client"
+
+    lock = threading.Lock()
+
+    def wrap(create):
+        def timed(**kwargs):
+            started = time.perf_counter()
+            try:
+                return create(**kwargs)
+            finally:
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        return timed
+
+    client.locations.create = wrap(client.locations.create)
+    client.boxes.create = wrap(client.boxes.create)
+    return client
+
+
+def run_case(case: str, size: str, latency: float, workers: int) -> Dict[str, Any]:
+    "Run one case in this process"
+
+    # Imported before the clock starts, inventory_builder is not free to import
+    from src import inventory_builder
+    from src import sinks
+    from src import standin
+    from src import throttle
+
+    config = storage(size)
+    objects = sum(hierarchy.count_nodes(config).values())
+    latencies: List[float] = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "inventory_locations.csv")
+        started = time.perf_counter()
+
+        if case == "write_levels":
+            write_levels(config)
+        elif case == "write_to_csv":
+            with sinks.CsvSink(output) as sink:
+                write_levels(config, sink=sink)
+        elif case == "iter_nodes_csv":
+            with sinks.CsvSink(output) as sink:
+                for node in hierarchy.iter_nodes(config):
+                    sink.write(node)
+        elif case == "main":
+            parameters = settings.DevelopmentSettings(max_workers=workers)
+            throttle.configure(max_concurrency=workers)
+            client = timed_client(standin.FakeBenchling(latency=latency, jitter=0), latencies)
+            inventory_builder.main(
+                config, parameters, client, "boxsch_bench", output_path=output
+            )
+            objects += 1  # The parent location
+        else:
+            raise ValueError(f"Unknown case: {case}")
+
+        seconds = time.perf_counter() - started
+
+    result = {
+        "case": case,
+        "size": size,
+        "objects": objects,
+        "seconds": round(seconds, 4),
+        "objects_per_second": round(objects / seconds, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if latencies:
+        cut = statistics.quantiles(latencies, n=100)
+        result.update(p50_ms=round(cut[49] * 1000, 3), p99_ms=round(cut[98] * 1000, 3))
+    return result
+
+
+def run_isolated(case: str, size: str, latency: float, workers: int) -> Dict[str, Any]:
+    "Run one case in a fresh interpreter"
+
+    output = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--case", case,
+            "--sizes", size,
+            "--latency", str(latency),
+            "--workers", str(workers),
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    "Print every metric's change against the baseline, return the regressions"
+
+    previous = {(e["case"], e["size"]): e for e in baseline["results"]}
+    regressions = []
+
+    for result in results:
+        before = previous.get((result["case"], result["size"]))
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in result or not before.get(metric):
+                continue
+            change = result[metric] / before[metric] - 1
+            worse = -change if metric in THROUGHPUT_METRICS else change
+            flag = "REGRESSION" if worse > tolerance else ""
+            line = (
+                f"{result['case']:>15} {result['size']:>4} {metric:>18}: "
+                f"{before[metric]:>12} -> {result[metric]:>12} ({change:+.1%}) {flag}"
+            )
+            print(line)
+            if flag:
+                regressions.append(line.strip())
+    return regressions
+
+
+@click.command()
+@click.option("--case", default=None, help="Run only this case in this process, prints JSON.")
+@click.option("--sizes", default="1e3,1e4,1e5", show_default=True, help="Of " + ",".join(SIZES))
+@click.option("--api_sizes", default="1e3", show_default=True, help="Sizes of the main case.")
+@click.option("--latency", type=float, default=0.02, show_default=True, help="Seconds per call.")
+@click.option("--workers", type=int, default=8, show_default=True)
+@click.option("--label", default=None, help="Results go to benchmarks/results/<label>.json.")
+@click.option("--compare", "baseline_path", type=click.Path(exists=True), default=None)
+@click.option("--tolerance", type=float, default=0.1, show_default=True)
+def cli(
+    case: Optional[str],
+    sizes: str,
+    api_sizes: str,
+    latency: float,
+    workers: int,
+    label: Optional[str],
+    baseline_path: Optional[str],
+    tolerance: float,
+):
+    if case is not None:
+        print(json.dumps(run_case(case, sizes, latency, workers)))
+        return
+
+    results = []
+    for case in CASES:
+        for size in (api_sizes if case == "main" else sizes).split(","):
+            result = run_isolated(case, size, latency, workers)
+            results.append(result)
+            print(
+                f"{case:>15} {size:>4}: {result['objects']:>9} objects in "
+                f"{result['seconds']:8.3f}s, {result['objects_per_second']:>11} objects/s, "
+                f"peak RSS {result['peak_rss_mb']} MB"
+                + (
+                    f", p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms"
+                    if "p50_ms" in result
+                    else ""
+                )
+            )
+
+    label = label or time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", f"{label}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "label": label,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "latency": latency,
+                "workers": workers,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results saved to {path}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} regressions over {tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,87 @@
+"""asyncio counterpart of pipeline.create_stream.
+
+benchling_sdk only ships a synchronous client, so each create runs on a dedicated
+thread pool while the fan-out, ordering and parent/child dependencies are driven from
+a single event loop and bounded by a semaphore.
+"""
+
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+
+from src import log
+from src import models
+from src import pipeline
+from src.journal import Journal
+
+
+logger = log.logger()
+
+
+async def create_stream(
+    nodes: Iterable[models.Node],
+    parent_barcode: str,
+    parent_storage_id: str,
+    benchling_client: Any,
+    schemas: Dict[str, str],
+    concurrency: int,
+    journal: Optional[Journal] = None,
+    max_buffered: Optional[int] = None,
+) -> Counter:
+    """Create every node below parent_barcode with at most `concurrency` creates in
+    flight, starting children as soon as their parent exists. Nodes already in the
+    journal are skipped, and at most max_buffered nodes are pulled from the stream
+    ahead of completion.
+
+    returns:
+        Number of completed (created or skipped) nodes per level
+    """
+    logger.info("initiated")
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    buffer = asyncio.Semaphore(max_buffered or 4 * concurrency)
+    completed: Counter = Counter()
+
+    # Locations only, each resolves to the storage id once the location exists
+    storage_ids: Dict[str, asyncio.Future] = {parent_barcode: loop.create_future()}
+    storage_ids[parent_barcode].set_result(parent_storage_id)
+
+    with ThreadPoolExecutor(
+        max_workers=concurrency, initializer=log.adopt, initargs=(log.current(),)
+    ) as pool:
+
+        async def create(node: models.Node, parent: asyncio.Future) -> None:
+            try:
+                parent_id = await parent
+                storage_id = journal.get(node.key) if journal is not None else None
+                if storage_id is None:
+                    async with semaphore:
+                        storage_id = await loop.run_in_executor(
+                            pool,
+                            pipeline.create_node,
+                            node,
+                            schemas[node.level],
+                            parent_id,
+                            benchling_client,
+                            journal,
+                        )
+                if node.barcode is not None:
+                    storage_ids[node.barcode].set_result(storage_id)
+                completed[node.level] += 1
+            finally:
+                buffer.release()
+
+        # A TaskGroup cancels every other create as soon as one fails
+        async with asyncio.TaskGroup() as group:
+            for node in nodes:
+                await buffer.acquire()
+                parent = storage_ids.get(node.parent_barcode)
+                if parent is None:
+                    raise ValueError(f"No parent location for: {node.parent_barcode}")
+                if node.barcode is not None:
+                    storage_ids[node.barcode] = loop.create_future()
+                group.create_task(create(node, parent))
+
+    return completed
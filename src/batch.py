@@ -0,0 +1,216 @@
+"""Build many parent locations from one manifest, without prompts.
+
+A manifest is a YAML, JSON or CSV list of StorageConfig entries. Every entry is
+validated before anything is created, then the freezers are built in parallel. All
+their creates share the global concurrency budget of the throttle.
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import click
+from pydantic import BaseModel, ValidationError
+
+from src import journal
+from src import log
+from src import settings
+from src.journal import Journal
+
+
+logger = log.logger()
+
+
+class FreezerResult(BaseModel):
+    parent_barcode: str
+    objects: int
+    seconds: float
+    error: Optional[str] = None
+
+    @property
+    def objects_per_second(self) -> float:
+        return self.objects / self.seconds if self.seconds else 0.0
+
+
+def read_entries(path: str) -> List[Dict[str, Any]]:
+    "Raw manifest entries, either a top-level list or a list under 'freezers'"
+
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".csv":
+        with open(path, newline="") as f:
+            # Empty cells stand for the optional drawer_prefix / drawer_in_full
+            return [
+                {key: value or None for key, value in row.items()}
+                for row in csv.DictReader(f)
+            ]
+
+    with open(path) as f:
+        if extension in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError(
+                    "PyYAML is required for YAML manifests, use JSON or CSV otherwise"
+                ) from e
+            entries = yaml.safe_load(f)
+        elif extension == ".json":
+            entries = json.load(f)
+        else:
+            raise ValueError(f"Unsupported manifest format: {path}")
+
+    if isinstance(entries, dict):
+        entries = entries.get("freezers")
+    if not isinstance(entries, list):
+        raise ValueError(f"Manifest must contain a list of freezers: {path}")
+    return entries
+
+
+def load_manifest(path: str) -> List[settings.StorageConfig]:
+    "Validate every manifest entry up front and report all problems at once"
+
+    configs = []
+    errors = []
+
+    for number, entry in enumerate(read_entries(path), start=1):
+        try:
+            configs.append(settings.StorageConfig(**entry))
+        except (TypeError, ValidationError) as e:
+            errors.append(f"entry {number}: {e}")
+
+    seen = set()
+    for config in configs:
+        if config.parent_barcode in seen:
+            errors.append(f"duplicate parent_barcode: {config.parent_barcode}")
+        seen.add(config.parent_barcode)
+
+    if errors:
+        raise ValueError("Invalid manifest:\n" + "\n".join(errors))
+    return configs
+
+
+def journal_path(output_dir: str, storage: settings.StorageConfig) -> str:
+    return os.path.join(output_dir, f"{storage.parent_barcode}.journal.jsonl")
+
+
+def check_journals(
+    configs: List[settings.StorageConfig], output_dir: str, resume: bool, overwrite: bool
+) -> None:
+    "Raise FileExistsError, before anything is built, for every earlier run's journal"
+
+    errors = []
+    for storage in configs:
+        try:
+            journal.check_overwrite(journal_path(output_dir, storage), resume, overwrite)
+        except FileExistsError as e:
+            errors.append(str(e))
+    if errors:
+        raise FileExistsError("\n".join(errors))
+
+
+def build_freezer(
+    storage: settings.StorageConfig,
+    parameters: Any,
+    benchling_client: Any,
+    resume: bool,
+    output_dir: str,
+    overwrite_journal: bool = False,
+) -> FreezerResult:
+    "Build one freezer, a failure is reported in the result instead of raised"
+
+    # Imported here, inventory_builder imports batch for its CLI
+    from src import inventory_builder
+
+    started = time.perf_counter()
+
+    try:
+        box_schema = settings.box_schema_id(
+            n_dimension=storage.box_dimension, tenant=parameters.tenant
+        )
+        with Journal(
+            journal_path(output_dir, storage), resume=resume, overwrite=overwrite_journal
+        ) as freezer_journal:
+            completed = inventory_builder.main(
+                storage,
+                parameters,
+                benchling_client,
+                box_schema,
+                journal=freezer_journal,
+                output_path=os.path.join(
+                    output_dir, f"{storage.parent_barcode}_inventory_locations.csv"
+                ),
+            )
+    except Exception as e:
+        logger.error(f"{storage.parent_barcode} failed: {e}")
+        return FreezerResult(
+            parent_barcode=storage.parent_barcode,
+            objects=0,
+            seconds=time.perf_counter() - started,
+            error=str(e),
+        )
+
+    return FreezerResult(
+        parent_barcode=storage.parent_barcode,
+        objects=1 + sum(completed.values()),  # Including the parent location
+        seconds=time.perf_counter() - started,
+    )
+
+
+def build_all(
+    configs: List[settings.StorageConfig],
+    parameters: Any,
+    benchling_client: Any,
+    parallel_freezers: int = 4,
+    resume: bool = False,
+    output_dir: str = ".",
+    overwrite_journal: bool = False,
+) -> List[FreezerResult]:
+    """Build every freezer of the manifest, parallel_freezers at a time.
+
+    The concurrency budget shared by all freezers is the throttle's, see
+    throttle.configure.
+    """
+    logger.info("initiated")
+
+    check_journals(configs, output_dir, resume, overwrite_journal)
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    def build(storage: settings.StorageConfig) -> FreezerResult:
+        with log.context(parent_barcode=storage.parent_barcode):
+            return build_freezer(
+                storage, parameters, benchling_client, resume, output_dir, overwrite_journal
+            )
+
+    with ThreadPoolExecutor(max_workers=parallel_freezers) as pool:
+        results = list(pool.map(build, configs))
+
+    report(results, time.perf_counter() - started)
+
+    failed = [e for e in results if e.error is not None]
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} of {len(results)} freezers failed, rerun with --resume:\n"
+            + "\n".join(f"{e.parent_barcode}: {e.error}" for e in failed)
+        )
+    return results
+
+
+def report(results: List[FreezerResult], seconds: float) -> None:
+    "Per-freezer and overall throughput, seconds is the wall-clock time of the batch"
+    for e in results:
+        status = f"FAILED, {e.error}" if e.error is not None else "ok"
+        print(
+            f"{e.parent_barcode}: {e.objects} objects in {e.seconds:.1f}s "
+            f"({e.objects_per_second:.1f} objects/s) {status}"
+        )
+
+    total = sum(e.objects for e in results)
+    rate = total / seconds if seconds else 0.0
+    print(
+        f"Overall: {total} objects across {len(results)} freezers in {seconds:.1f}s "
+        f"({rate:.1f} objects/s)"
+    )
@@ -0,0 +1,240 @@
+"""Credential cache shared by repeated and parallel runs.
+
+The Secrets Manager secret and the OAuth access token are cached with a TTL in a
+Fernet-encrypted file, so a run does not need a boto3 session or a token exchange
+while the cached values are fresh. The key comes from INVENTORY_CACHE_KEY, or from a
+key file next to the cache that only the owner can read. A value that is close to
+expiring is still returned, and it is refreshed in the background (refresh-ahead).
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from benchling_sdk.auth.client_credentials_oauth2 import ClientCredentialsOAuth2
+
+from src import log
+
+
+logger = log.logger()
+
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "benchling-inventory", "credentials.bin"
+)
+KEY_VARIABLE = "INVENTORY_CACHE_KEY"
+SECRET_TTL = 3600.0
+
+# A loader returns the value to cache and the time.time() it expires at
+Loader = Callable[[], Tuple[Any, float]]
+
+
+def load_key(path: str) -> bytes:
+    "Fernet key from INVENTORY_CACHE_KEY, or from <path>.key, created on first use"
+
+    from cryptography.fernet import Fernet
+
+    if os.environ.get(KEY_VARIABLE):
+        return os.environ[KEY_VARIABLE].encode()
+
+    key_path = f"{path}.key"
+    try:
+        with open(key_path, "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(key_path) or ".", exist_ok=True)
+    key = Fernet.generate_key()
+    try:
+        # O_EXCL, a parallel run that got there first wins and its key is read back
+        descriptor = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(key_path, "rb") as f:
+            return f.read().strip()
+    with os.fdopen(descriptor, "wb") as f:
+        f.write(key)
+    return key
+
+
+class CredentialCache:
+    "Encrypted on-disk TTL cache with refresh-ahead, safe to share between threads"
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        key: Optional[bytes] = None,
+        refresh_ahead: float = 0.2,
+    ):
+        """refresh_ahead is the last fraction of a value's lifetime in which it is
+        refreshed in the background
+        """
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError as e:
+            raise ImportError(
+                "cryptography is required for the credential cache, "
+                "run with --no_credential_cache otherwise"
+            ) from e
+
+        self.path = path
+        self.refresh_ahead = refresh_ahead
+        self._fernet = Fernet(key or load_key(path))
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._refreshing = set()
+        self._entries = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        "Entries on disk, empty when the file is missing or was written with another key"
+
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self.path, "rb") as f:
+                return json.loads(self._fernet.decrypt(f.read()))
+        except FileNotFoundError:
+            return {}
+        except (InvalidToken, ValueError):
+            logger.warning(f"Ignoring unreadable credential cache {self.path}")
+            return {}
+
+    def _write(self, name: str, entry: Optional[Dict[str, Any]]) -> None:
+        "Merge one entry (None removes it) into the file, keeping what parallel runs wrote"
+
+        with self._lock:
+            entries = self._read()
+            if entry is None:
+                entries.pop(name, None)
+            else:
+                entries[name] = entry
+            self._entries = entries
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temporary = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(self._fernet.encrypt(json.dumps(entries).encode()))
+            os.replace(temporary, self.path)
+
+    def _load(self, name: str, loader: Loader) -> Any:
+        "Run the loader once per name, concurrent callers wait for its value"
+
+        with self._lock:
+            lock = self._loading.setdefault(name, threading.Lock())
+        with lock:
+            entry = self._entries.get(name)
+            now = time.time()
+            if entry is not None and entry["expires"] - now > self.refresh_ahead * entry["ttl"]:
+                return entry["value"]  # Loaded while this caller waited
+
+            value, expires = loader()
+            self._write(name, {"value": value, "expires": expires, "ttl": expires - now})
+            return value
+
+    def _refresh(self, name: str, loader: Loader) -> None:
+        try:
+            self._load(name, loader)
+        except Exception as e:
+            # The cached value is still valid, the next get retries
+            logger.warning(f"Refreshing {name} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+
+    def get(self, name: str, loader: Loader) -> Any:
+        "Cached value of name, loaded when missing or expired"
+
+        with self._lock:
+            entry = self._entries.get(name)
+        now = time.time()
+
+        if entry is None or entry["expires"] <= now:
+            return self._load(name, loader)
+
+        if entry["expires"] - now <= self.refresh_ahead * entry["ttl"]:
+            with self._lock:
+                start = name not in self._refreshing
+                self._refreshing.add(name)
+            if start:
+                threading.Thread(target=self._refresh, args=(name, loader), daemon=True).start()
+        return entry["value"]
+
+    def invalidate(self, name: str) -> None:
+        "Drop name, e.g. after the tenant rejected a cached credential"
+        self._write(name, None)
+
+
+def parse_secret(secret: Any) -> Dict[str, str]:
+    "Secrets Manager returns the client_id / client_secret pair as a JSON string"
+    if isinstance(secret, (str, bytes)):
+        return json.loads(secret)
+    return secret
+
+
+def get_secret(secret_name: str, cache: Optional[CredentialCache] = None) -> Dict[str, str]:
+    "Parsed secret, from the cache while it is fresh"
+
+    def load() -> Tuple[Dict[str, str], float]:
+        # boto3 is only imported when the secret is not cached
+        from src import secrets_manager
+
+        secret = parse_secret(secrets_manager.get_secret(secret_name=secret_name))
+        return secret, time.time() + SECRET_TTL
+
+    if cache is None:
+        return load()[0]
+    return cache.get(f"secret:{secret_name}", load)
+
+
+class CachedClientCredentialsOAuth2(ClientCredentialsOAuth2):
+    """ClientCredentialsOAuth2 that reuses access tokens of earlier and parallel runs.
+    Given the secret's name, invalidate reloads the secret as well, it may have rotated.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        cache: CredentialCache,
+        secret_name: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(client_id=client_id, client_secret=client_secret, **kwargs)
+        self._client_id = client_id
+        self._cache = cache
+        self._secret_name = secret_name
+        self._token_names = set()
+
+    def _vend(self, base_url: str) -> Tuple[str, float]:
+        with self._lock:
+            self.vend_new_token(base_url)
+            token = self._token
+        # The SDK's refresh_time already leaves a buffer before the real expiry
+        return token.access_token, token.refresh_time.timestamp()
+
+    def get_authorization_header(self, base_url: str) -> str:
+        name = f"token:{base_url}:{self._client_id}"
+        self._token_names.add(name)
+        access_token = self._cache.get(name, lambda: self._vend(base_url))
+        return f"Bearer {access_token}"
+
+    def invalidate(self) -> None:
+        "Drop the credentials the tenant rejected, the next request vends a new token"
+
+        for name in list(self._token_names):
+            self._cache.invalidate(name)
+        if self._secret_name is None:
+            return
+
+        self._cache.invalidate(f"secret:{self._secret_name}")
+        secret = get_secret(self._secret_name, self._cache)
+        rotated = ClientCredentialsOAuth2(
+            client_id=secret["client_id"],
+            client_secret=secret["client_secret"],
+            httpx_client=self.httpx_client,
+        )
+        with self._lock:
+            self._client_id = secret["client_id"]
+            self._header_for_token_request = rotated._header_for_token_request
@@ -0,0 +1,131 @@
+"""Chunked csv export for upload through the Benchling UI.
+
+The node stream is split into one series of files per level (shelves, racks/canes,
+drawers/rows, boxes), each file bounded by max_rows and optionally max_bytes. The
+manifest lists the files level by level, so uploading them in manifest order always
+creates a parent before its children.
+"""
+
+import csv
+import io
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+from src import log
+from src import models
+
+
+logger = log.logger()
+
+LEVELS = ["shelf", "rack", "drawer", "box"]
+LOCATION_HEADER = ["Location Barcode", "Barcode", "Name"]
+BOX_HEADER = ["Location Barcode", "Name"]
+
+
+class ChunkWriter:
+    "Writes one level to size-bounded files <prefix>_<level>_<n>.csv"
+
+    def __init__(
+        self,
+        out_dir: str,
+        prefix: str,
+        level: str,
+        max_rows: int,
+        max_bytes: Optional[int],
+    ):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.level = level
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.header = BOX_HEADER if level == "box" else LOCATION_HEADER
+        self.chunks: List[Dict] = []
+
+        self._file = None
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _encode(self, row: List[str]) -> str:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(row)
+        return self._buffer.getvalue()
+
+    def _open(self) -> None:
+        name = f"{self.prefix}_{self.level}_{len(self.chunks) + 1:03d}.csv"
+        self._file = open(
+            os.path.join(self.out_dir, name), "w", newline="", encoding="utf-8"
+        )
+        line = self._encode(self.header)
+        self._file.write(line)
+        self.chunks.append(
+            {"path": name, "level": self.level, "rows": 0, "bytes": len(line.encode())}
+        )
+
+    def write(self, row: List[str]) -> None:
+        line = self._encode(row)
+        size = len(line.encode())
+
+        chunk = self.chunks[-1] if self._file is not None else None
+        if chunk is None or chunk["rows"] >= self.max_rows or (
+            self.max_bytes is not None
+            and chunk["rows"]
+            and chunk["bytes"] + size > self.max_bytes
+        ):
+            self.close()
+            self._open()
+            chunk = self.chunks[-1]
+
+        self._file.write(line)
+        chunk["rows"] += 1
+        chunk["bytes"] += size
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def export_chunks(
+    nodes: Iterable[models.Node],
+    out_dir: str,
+    max_rows: int = 1000,
+    max_bytes: Optional[int] = None,
+    prefix: str = "inventory_locations",
+) -> str:
+    """Split the node stream into per-level chunk files under out_dir.
+
+    returns:
+        Path of manifest.json, listing the chunk files in upload order
+    """
+    logger.info("initiated")
+
+    if max_rows < 1:
+        raise ValueError(f"max_rows must be at least 1, got: {max_rows}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    writers = {
+        level: ChunkWriter(out_dir, prefix, level, max_rows, max_bytes)
+        for level in LEVELS
+    }
+
+    try:
+        for node in nodes:
+            if node.barcode is None:
+                writers[node.level].write([node.parent_barcode, node.name])
+            else:
+                writers[node.level].write(
+                    [node.parent_barcode, node.barcode, node.name]
+                )
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    # Every level is complete before the next one starts, parents before children
+    files = [chunk for level in LEVELS for chunk in writers[level].chunks]
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    with open(manifest_path, "w") as f:
+        json.dump({"upload_order": files}, f, indent=2)
+
+    return manifest_path
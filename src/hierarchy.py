@@ -0,0 +1,184 @@
+"""Lazy, depth-first generation of the storage hierarchy.
+
+iter_nodes yields every shelf, rack/cane, drawer/row and box below the parent location
+as a models.Node, always after its parent. The csv sink and the API pipelines consume
+the same stream, so memory does not grow with the number of boxes a config expands to.
+
+Template computes any single node from its index, or parses a barcode back to its
+coordinates, without generating the tree at all.
+"""
+
+import math
+import re
+from typing import Dict, Iterator, Optional, Tuple
+
+from src import models
+from src import settings
+
+
+def iter_nodes(
+    storage: settings.StorageConfig, top: Optional[range] = None
+) -> Iterator[models.Node]:
+    """Yield every node below storage.parent_barcode depth-first, parents before children.
+    top limits the stream to the subtrees of those shelf (or rack/cane, for LN2) ordinals.
+    """
+
+    def boxes(parent_barcode: str) -> Iterator[models.Node]:
+        for b_count in range(1, storage.boxes + 1):
+            yield models.Node(
+                "box", parent_barcode, None, models.child_name(models.BOX_NAME, b_count)
+            )
+
+    def drawers(rack_barcode: str) -> Iterator[models.Node]:
+        for d_count in range(1, storage.drawers + 1):
+            barcode = models.child_barcode(rack_barcode, storage.drawer_prefix, d_count)
+            name = models.child_name(storage.drawer_in_full, d_count)
+            yield models.Node("drawer", rack_barcode, barcode, name)
+            yield from boxes(barcode)
+
+    def racks(parent_barcode: str, ordinals: range) -> Iterator[models.Node]:
+        for r_count in ordinals:
+            barcode = models.child_barcode(parent_barcode, storage.rack_prefix, r_count)
+            name = models.child_name(storage.rack_in_full, r_count)
+            yield models.Node("rack", parent_barcode, barcode, name)
+            # Boxes go directly into racks/canes for LN2 configurations
+            yield from drawers(barcode) if storage.drawers != 0 else boxes(barcode)
+
+    if top is None:
+        top = range(1, (storage.shelves or storage.racks) + 1)
+
+    if storage.shelves != 0:
+        for s_count in top:
+            barcode = models.child_barcode(
+                storage.parent_barcode, models.SHELF_PREFIX, s_count
+            )
+            name = models.child_name(models.SHELF_NAME, s_count)
+            yield models.Node("shelf", storage.parent_barcode, barcode, name)
+            yield from racks(barcode, range(1, storage.racks + 1))
+    else:
+        # Racks within parent for LN2 configuration
+        yield from racks(storage.parent_barcode, top)
+
+
+def count_nodes(storage: settings.StorageConfig) -> Dict[str, int]:
+    "Number of nodes per level iter_nodes will yield, without generating them"
+
+    shelves = storage.shelves
+    racks = max(shelves, 1) * storage.racks
+    drawers = racks * storage.drawers
+    boxes = (drawers if storage.drawers != 0 else racks) * storage.boxes
+    return {"shelf": shelves, "rack": racks, "drawer": drawers, "box": boxes}
+
+
+class Template:
+    """Closed-form barcodes and names of a storage configuration.
+
+    Nodes of a level are numbered 0..count(level)-1 in csv order, the order the write_*
+    functions list them in. A node's coordinates are the ordinals of its ancestors and
+    itself (shelf 2, rack 1 -> (2, 1)), so everything about it follows from its index by
+    mixed-radix arithmetic, and parse() maps a barcode or box key back to coordinates.
+    """
+
+    __slots__ = ("parent_barcode", "levels", "fanout", "prefixes", "names", "_pattern")
+
+    def __init__(self, storage: settings.StorageConfig):
+        self.parent_barcode = storage.parent_barcode
+        self.levels = [models.LEVELS[depth] for depth in models.active_levels(storage)]
+        self.fanout = {
+            "shelf": storage.shelves,
+            "rack": storage.racks,
+            "drawer": storage.drawers,
+            "box": storage.boxes,
+        }
+        self.prefixes = {
+            "shelf": models.SHELF_PREFIX,
+            "rack": storage.rack_prefix,
+            "drawer": storage.drawer_prefix,
+        }
+        self.names = {
+            "shelf": models.SHELF_NAME,
+            "rack": storage.rack_in_full,
+            "drawer": storage.drawer_in_full,
+            "box": models.BOX_NAME,
+        }
+
+        # e.g. EQS-1234(?:-S(\d+)(?:-R(\d+))?)?(?:/Box (\d+))?
+        pattern = ""
+        for level in reversed(self.levels):
+            if level != "box":
+                pattern = rf"(?:-{re.escape(self.prefixes[level])}(\d+){pattern})?"
+        if "box" in self.levels:
+            pattern += rf"(?:/{re.escape(models.BOX_NAME)} (\d+))?"
+        self._pattern = re.compile(re.escape(storage.parent_barcode) + pattern)
+
+    def count(self, level: str) -> int:
+        "Number of nodes of a level, 0 if the configuration has none"
+        if level not in self.levels:
+            return 0
+        depth = self.levels.index(level) + 1
+        return math.prod(self.fanout[level] for level in self.levels[:depth])
+
+    def coordinates(self, level: str, index: int) -> Tuple[int, ...]:
+        "Ordinals from the top level down to the index-th node of level"
+
+        if not 0 <= index < self.count(level):
+            raise IndexError(f"No {level} {index} in {self.parent_barcode}")
+        ordinals = []
+        for level in reversed(self.levels[: self.levels.index(level) + 1]):
+            index, ordinal = divmod(index, self.fanout[level])
+            ordinals.append(ordinal + 1)
+        return tuple(reversed(ordinals))
+
+    def index(self, coordinates: Tuple[int, ...]) -> Tuple[str, int]:
+        "Level and index of the node at coordinates, the parent location for ()"
+
+        if not coordinates:
+            return "parent", 0
+        if len(coordinates) > len(self.levels):
+            raise ValueError(f"{coordinates} is deeper than {self.parent_barcode}")
+        index = 0
+        for level, ordinal in zip(self.levels, coordinates):
+            if not 1 <= ordinal <= self.fanout[level]:
+                raise ValueError(f"{level} {ordinal} is out of range for {self.parent_barcode}")
+            index = index * self.fanout[level] + ordinal - 1
+        return self.levels[len(coordinates) - 1], index
+
+    def _barcode(self, coordinates: Tuple[int, ...]) -> str:
+        barcode = self.parent_barcode
+        for level, ordinal in zip(self.levels, coordinates):
+            barcode = models.child_barcode(barcode, self.prefixes[level], ordinal)
+        return barcode
+
+    def barcode(self, level: str, index: int) -> Optional[str]:
+        "None for boxes, Benchling autogenerates them"
+        coordinates = self.coordinates(level, index)
+        return None if level == "box" else self._barcode(coordinates)
+
+    def name(self, level: str, index: int) -> str:
+        return models.child_name(self.names[level], self.coordinates(level, index)[-1])
+
+    def parent(self, level: str, index: int) -> Tuple[str, int]:
+        "Level and index of the node's parent, ('parent', 0) for the top level"
+        return self.index(self.coordinates(level, index)[:-1])
+
+    def node(self, level: str, index: int) -> models.Node:
+        coordinates = self.coordinates(level, index)
+        return models.Node(
+            level,
+            self._barcode(coordinates[:-1]),
+            None if level == "box" else self._barcode(coordinates),
+            models.child_name(self.names[level], coordinates[-1]),
+        )
+
+    def parse(self, key: str) -> Tuple[int, ...]:
+        "Coordinates of a location barcode or box key (models.Node.key) of this configuration"
+
+        match = self._pattern.fullmatch(key)
+        if match is None:
+            raise ValueError(f"{key} is not a barcode of {self.parent_barcode}")
+        coordinates = tuple(int(ordinal) for ordinal in match.groups() if ordinal is not None)
+        is_box = "box" in self.levels and match.group(self._pattern.groups) is not None
+        if is_box and len(coordinates) != len(self.levels):
+            raise ValueError(f"{key} is not a box of {self.parent_barcode}")
+        self.index(coordinates)  # Range check
+        return coordinates
@@ -0,0 +1,154 @@
+"""Local storage index written after every run.
+
+A SQLite file maps every location and box key (the barcode for locations,
+"<parent barcode>/<name>" for boxes) to its storage id and its parent's key and
+storage id, so downstream jobs such as sample registration can resolve where to put
+things without querying Benchling. Index opens the file read-only and memory-mapped.
+"""
+
+import os
+import sqlite3
+from typing import Dict, Iterator, List, Optional
+
+from src import hierarchy
+from src import log
+from src import models
+from src import settings
+
+
+logger = log.logger()
+
+MMAP_SIZE = 1 << 28
+
+SCHEMA = """
+CREATE TABLE storage (
+    key TEXT PRIMARY KEY,
+    storage_id TEXT NOT NULL,
+    parent_key TEXT,
+    parent_id TEXT,
+    level TEXT NOT NULL,
+    name TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX storage_by_id ON storage (storage_id);
+CREATE INDEX storage_by_parent ON storage (parent_key);
+"""
+
+
+def default_path(storage: settings.StorageConfig, output_path: str) -> str:
+    "<asset tag>.index.sqlite next to the run's csv"
+    return os.path.join(
+        os.path.dirname(output_path), f"{storage.parent_barcode}.index.sqlite"
+    )
+
+
+def iter_entries(
+    storage: settings.StorageConfig, storage_ids: Dict[str, str]
+) -> Iterator[models.IndexEntry]:
+    "Entries of every node that has a storage id, the parent location first"
+
+    parent_id = storage_ids.get(storage.parent_barcode)
+    if parent_id is None:
+        return
+    yield models.IndexEntry(
+        storage.parent_barcode, parent_id, None, None, "parent", storage.parent_name
+    )
+
+    for node in hierarchy.iter_nodes(storage):
+        storage_id = storage_ids.get(node.key)
+        if storage_id is None:
+            continue
+        yield models.IndexEntry(
+            node.key,
+            storage_id,
+            node.parent_barcode,
+            storage_ids.get(node.parent_barcode),
+            node.level,
+            node.name,
+        )
+
+
+def write_index(
+    path: str, storage: settings.StorageConfig, storage_ids: Dict[str, str]
+) -> int:
+    """Write the index of a run from its key -> storage id map, e.g. Journal.completed.
+    The file is replaced atomically, readers never see a partial index.
+
+    returns:
+        Number of indexed locations and boxes, including the parent location
+    """
+    logger.info("initiated")
+
+    temporary = f"{path}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+
+    connection = sqlite3.connect(temporary)
+    try:
+        # Nothing to recover on a crash, the previous index stays in place
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.executescript(SCHEMA)
+        with connection:
+            cursor = connection.executemany(
+                "INSERT INTO storage VALUES (?, ?, ?, ?, ?, ?)",
+                iter_entries(storage, storage_ids),
+            )
+            rows = cursor.rowcount
+    finally:
+        connection.close()
+
+    os.replace(temporary, path)
+    logger.info(f"{rows} locations and boxes indexed in {path}")
+    return rows
+
+
+class Index:
+    "Read-only, memory-mapped lookups in an index written by write_index"
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self._connection = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+
+    def _one(self, where: str, value: str) -> Optional[models.IndexEntry]:
+        row = self._connection.execute(
+            f"SELECT * FROM storage WHERE {where} = ?", (value,)
+        ).fetchone()
+        return models.IndexEntry(*row) if row is not None else None
+
+    def get(self, key: str) -> Optional[models.IndexEntry]:
+        "Entry of a location barcode or box key, None when it is not indexed"
+        return self._one("key", key)
+
+    def storage_id(self, key: str) -> Optional[str]:
+        entry = self.get(key)
+        return entry.storage_id if entry is not None else None
+
+    def parent_id(self, key: str) -> Optional[str]:
+        entry = self.get(key)
+        return entry.parent_id if entry is not None else None
+
+    def by_storage_id(self, storage_id: str) -> Optional[models.IndexEntry]:
+        return self._one("storage_id", storage_id)
+
+    def children(self, key: str) -> List[models.IndexEntry]:
+        rows = self._connection.execute(
+            "SELECT * FROM storage WHERE parent_key = ?", (key,)
+        ).fetchall()
+        return [models.IndexEntry(*row) for row in rows]
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM storage").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "Index":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
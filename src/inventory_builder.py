@@ -1,58 +1,120 @@
-import csv
-from typing import Any, Dict, List, Literal, Optional
-
-from benchling_sdk import models as benchling_models
-from benchling_sdk.auth.client_credentials_oauth2 import ClientCredentialsOAuth2
-from benchling_sdk.benchling import Benchling
-
+import asyncio
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import click
+
+from src import async_pipeline
+from src import batch
+from src import hierarchy
+from src import index
+from src import journal
 from src import log
+from src import metrics
 from src import models
-from src import secrets_manager
+from src import offline
+from src import pipeline
+from src import planner
+from src import reconcile
+from src import schemas
 from src import settings
+from src import shard
+from src import sinks
+from src import standin
+from src import throttle
+from src.journal import Journal
+
+# benchling_sdk (and boto3, through credentials) are imported where an API call is made,
+# so csv-only use and the tests don't pay for loading them, see offline.py
+if TYPE_CHECKING:
+    from src import credentials
 
 
 logger = log.logger()
 
 
-def create_session(tenant: str, auth: Dict):
-    benchling_client = Benchling(
-        url=f"https://{tenant}.benchling.com",
-        auth_method=ClientCredentialsOAuth2(
+def create_session(
+    tenant: str,
+    auth: Dict,
+    cache: Optional["credentials.CredentialCache"] = None,
+    max_connections: Optional[int] = None,
+    secret_name: Optional[str] = None,
+):
+    """With a credential cache, access tokens of earlier and parallel runs are reused,
+    and dropped along with the secret of secret_name when the tenant answers a 401.
+    Every session of the process shares one connection pool, see transport.py, sized
+    to max_connections or to the throttle's concurrency.
+    """
+
+    from benchling_sdk.auth.client_credentials_oauth2 import ClientCredentialsOAuth2
+    from benchling_sdk.benchling import Benchling
+
+    from src import credentials
+    from src import transport
+
+    if cache is not None:
+        auth_method = credentials.CachedClientCredentialsOAuth2(
             client_id=auth["client_id"],
             client_secret=auth["client_secret"],
+            cache=cache,
+            secret_name=secret_name,
+        )
+        throttle.on_unauthorized(auth_method.invalidate)
+    else:
+        auth_method = ClientCredentialsOAuth2(
+            client_id=auth["client_id"],
+            client_secret=auth["client_secret"],
+        )
+        throttle.on_unauthorized(None)
+
+    benchling_client = Benchling(
+        url=f"https://{tenant}.benchling.com",
+        auth_method=auth_method,
+        # Retries and backoff are handled by the shared throttle, see throttle.py
+        retry_strategy=None,
+        httpx_client=transport.shared_client(
+            max_connections or throttle.current().max_concurrency
         ),
     )
     return benchling_client
 
 
 def write_to_csv(
-    mode: Literal["w+", "a"],
+    sink: Optional[sinks.CsvSink],
     location_barcodes: List[str],
     names: List[str],
     barcodes: Optional[List[str]],
 ) -> None:
+    "Append one level's rows to the run's csv sink, skipping the header sentinels"
 
-    with open("inventory_locations.csv", mode, newline="") as f:
-        writer = csv.writer(f)
+    if sink is None:
+        return
 
-        if barcodes:
-            writer.writerows(zip(location_barcodes, barcodes, names))
-        else:
-            writer.writerows(zip(location_barcodes, names))
+    barcodes = barcodes[1:] if barcodes else repeat("")
+    for row in zip(location_barcodes[1:], barcodes, names[1:]):
+        sink.write_row(list(row))
 
 
-def write_shelves(shelves: int, parent_barcode: str) -> models.Location:
+def write_shelves(
+    shelves: int, parent_barcode: str, sink: Optional[sinks.CsvSink] = None
+) -> models.Location:
     "Write custom Shelf names and barcodes to csv"
     logger.info("initiated")
 
     location_barcodes = ["Location Barcode"] + [parent_barcode] * shelves
     shelf_barcodes = ["Barcode"] + [
-        f"{parent_barcode}-S{count}" for count in range(1, shelves + 1)
+        models.child_barcode(parent_barcode, models.SHELF_PREFIX, count)
+        for count in range(1, shelves + 1)
+    ]
+    shelf_names = ["Name"] + [
+        models.child_name(models.SHELF_NAME, count) for count in range(1, shelves + 1)
     ]
-    shelf_names = ["Name"] + [f"Shelf {count}" for count in range(1, shelves + 1)]
 
     write_to_csv(
-        mode="w+",
+        sink=sink,
         location_barcodes=location_barcodes,
         barcodes=shelf_barcodes,
         names=shelf_names,
@@ -68,7 +130,7 @@ def write_racks_or_canes(
     racks: int,
     parent_barcode: str,
     shelf_barcodes: List[str],
-    mode: Literal["w+", "a"],
+    sink: Optional[sinks.CsvSink] = None,
 ) -> models.Location:
     "Write custom [ Rack | Cane ] names and barcodes to csv"
     logger.info("initiated")
@@ -79,20 +141,19 @@ def write_racks_or_canes(
 
     if shelves != 0 and shelf_barcodes:
         for s_count in range(1, shelves + 1):
+            shelf_barcode = models.child_barcode(parent_barcode, models.SHELF_PREFIX, s_count)
             for r_count in range(1, racks + 1):
                 location_barcodes.append(shelf_barcodes[s_count])
-                rack_barcodes.append(
-                    f"{parent_barcode}-S{s_count}-{rack_prefix}{r_count}",
-                )
-                rack_names.append(f"{rack_in_full} {r_count}")
+                rack_barcodes.append(models.child_barcode(shelf_barcode, rack_prefix, r_count))
+                rack_names.append(models.child_name(rack_in_full, r_count))
     else:
         for r_count in range(1, racks + 1):
             location_barcodes.append(parent_barcode)
-            rack_barcodes.append(f"{parent_barcode}-{rack_prefix}{r_count}")
-            rack_names.append(f"{rack_in_full} {r_count}")
+            rack_barcodes.append(models.child_barcode(parent_barcode, rack_prefix, r_count))
+            rack_names.append(models.child_name(rack_in_full, r_count))
 
     write_to_csv(
-        mode=mode,
+        sink=sink,
         location_barcodes=location_barcodes,
         names=rack_names,
         barcodes=rack_barcodes,
@@ -106,6 +167,7 @@ def write_drawers_or_rows(
     prefix: str,
     name_in_full: str,
     drawers: int,
+    sink: Optional[sinks.CsvSink] = None,
 ) -> models.Location:
     "Write custom [ Drawer | Row ] names and barcodes to csv"
     logger.info("initiated")
@@ -117,11 +179,11 @@ def write_drawers_or_rows(
     for e in rack_barcodes[1:]:
         for i in range(1, drawers + 1):
             location_barcodes.append(e)
-            barcodes.append(f"{e}-{prefix}{i}")
-            names.append(f"{name_in_full} {i}")
+            barcodes.append(models.child_barcode(e, prefix, i))
+            names.append(models.child_name(name_in_full, i))
 
     write_to_csv(
-        mode="a",
+        sink=sink,
         location_barcodes=location_barcodes,
         barcodes=barcodes,
         names=names,
@@ -130,7 +192,9 @@ def write_drawers_or_rows(
     return models.Location(barcodes=barcodes, names=names)
 
 
-def write_boxes(boxes: int, barcodes: List[str]) -> List[str]:
+def write_boxes(
+    boxes: int, barcodes: List[str], sink: Optional[sinks.CsvSink] = None
+) -> List[str]:
     "Write Box names [Box 1, Box 2, Box 3...] to csv."
     logger.info("initiated")
 
@@ -139,10 +203,12 @@ def write_boxes(boxes: int, barcodes: List[str]) -> List[str]:
 
     for e in range(1, len(barcodes)):
         location_barcodes.extend([barcodes[e]] * boxes)
-        box_names.extend([f"Box {b_count}" for b_count in range(1, boxes + 1)])
+        box_names.extend(
+            [models.child_name(models.BOX_NAME, b_count) for b_count in range(1, boxes + 1)]
+        )
 
     write_to_csv(
-        mode="a", location_barcodes=location_barcodes, names=box_names, barcodes=None
+        sink=sink, location_barcodes=location_barcodes, names=box_names, barcodes=None
     )
 
     return box_names
@@ -154,14 +220,18 @@ def post_parent_location(
     "POST request to create storage location with custom barcode"
     logger.info("initiated")
 
-    r = benchling_client.locations.create(
-        location=benchling_models.LocationCreate(
+    from benchling_sdk import models as benchling_models
+
+    storage_id = pipeline.post_create(
+        benchling_models.LocationCreate(
             name=parent_name,
             schema_id=location_schema,
             barcode=parent_barcode,
         ),
+        benchling_client,
+        level="parent",
     )
-    return [r.id]
+    return [storage_id]
 
 
 def extend_list(barcodes: List[str], parent_storage_id: List[str]) -> List[str]:
@@ -171,49 +241,56 @@ def extend_list(barcodes: List[str], parent_storage_id: List[str]) -> List[str]:
     return [e for e in parent_storage_id for _ in range(fold)]
 
 
+def create_location(location: Any, benchling_client: Any) -> str:
+    "POST a single LocationCreate and return the new storage id"
+    return pipeline.post_create(location, benchling_client)
+
+
 def post_child_location(
     barcodes: List[str],
     names: List[str],
     parent_storage_id: List[str],
     location_schema: str,
     benchling_client: Any,
+    max_workers: int = 1,
 ) -> List[str]:
-    "POST request to create interior locations with custom barcodes"
+    """POST request to create interior locations with custom barcodes
+
+    With max_workers > 1 the creates are issued from a bounded thread pool. Storage ids
+    are always returned in the same order as the input barcodes so that extend_list
+    maps the next level onto the correct parents.
+    """
     logger.info("initiated")
 
-    storage_ids = []
+    from benchling_sdk import models as benchling_models
 
     if len(parent_storage_id) == 1:
-        for e in range(len(barcodes) - 1):
-            r = benchling_client.locations.create(
-                location=benchling_models.LocationCreate(
-                    name=names[e + 1],
-                    schema_id=location_schema,
-                    barcode=barcodes[e + 1],
-                    parent_storage_id=parent_storage_id[0],
-                ),
-            )
-            storage_ids.append(r.id)
-
+        parent_storage_ids = parent_storage_id * (len(barcodes) - 1)
+    elif len(parent_storage_id) < len(barcodes):
+        parent_storage_ids = extend_list(barcodes, parent_storage_id)
     else:
-        if len(parent_storage_id) < len(barcodes):
-            parent_storage_ids = extend_list(barcodes, parent_storage_id)
-            barcodes = barcodes[1:]  # Ensures the lists are of all same length
-            names = names[1:]
-
-            for e in range(len(barcodes)):
-
-                r = benchling_client.locations.create(
-                    location=benchling_models.LocationCreate(
-                        name=names[e],
-                        schema_id=location_schema,
-                        barcode=barcodes[e],
-                        parent_storage_id=parent_storage_ids[e],
-                    ),
-                )
+        return []
 
-                storage_ids.append(r.id)
-    return storage_ids
+    locations = [
+        benchling_models.LocationCreate(
+            name=name,
+            schema_id=location_schema,
+            barcode=barcode,
+            parent_storage_id=parent_id,
+        )
+        for barcode, name, parent_id in zip(
+            barcodes[1:], names[1:], parent_storage_ids
+        )
+    ]
+
+    if max_workers <= 1:
+        return [create_location(e, benchling_client) for e in locations]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Executor.map yields results in submission order, not completion order
+        return list(
+            pool.map(lambda e: create_location(e, benchling_client), locations)
+        )
 
 
 def post_box(
@@ -221,138 +298,651 @@ def post_box(
     parent_storage_id: List[str],
     schema: str,
     benchling_client: Any,
-) -> None:
-    "POST request to create boxes with autogenerated barcodes"
+    max_workers: int = 1,
+) -> List[str]:
+    """POST request to create boxes with autogenerated barcodes
+
+    With max_workers > 1 the creates are issued from a bounded thread pool.
+    Storage ids are returned in the same order as box_names.
+    """
     logger.info("initiated")
 
+    from benchling_sdk import models as benchling_models
+
     if len(parent_storage_id) < len(box_names):
         parent_storage_ids = extend_list(box_names, parent_storage_id)
     else:
         parent_storage_ids = parent_storage_id
 
-    count = 0
-
-    for e in range(1, len(box_names)):
-        benchling_client.boxes.create(
-            box=benchling_models.BoxCreate(
-                name=box_names[e],
-                schema_id=schema,
-                parent_storage_id=parent_storage_ids[e - 1],
-            ),
+    boxes = [
+        benchling_models.BoxCreate(
+            name=name,
+            schema_id=schema,
+            parent_storage_id=parent_id,
         )
+        for name, parent_id in zip(box_names[1:], parent_storage_ids)
+    ]
+
+    if max_workers <= 1:
+        storage_ids = [pipeline.post_create(e, benchling_client) for e in boxes]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            storage_ids = list(
+                pool.map(lambda e: pipeline.post_create(e, benchling_client), boxes)
+            )
 
-        count += 1
+    print(f"{len(storage_ids)} of {len(box_names) - 1} boxes successfully created")
 
-    print(f"{count} of {len(box_names) - 1} boxes successfully created")
+    return storage_ids
 
 
-def main():
+def schemas_by_level(parameters: Any, box_schema: str) -> Dict[str, str]:
+    return {
+        "shelf": parameters.shelf_schema,
+        "rack": parameters.rack_schema,
+        "drawer": parameters.drawer_schema,
+        "box": box_schema,
+    }
 
-    # Create parent_location
-    top_parent_storage_id = post_parent_location(
+
+def create_parent_location(
+    storage: settings.StorageConfig,
+    parameters: Any,
+    benchling_client: Any,
+    journal: Optional[Journal] = None,
+) -> str:
+    "Create the parent location unless the journal already holds its storage id"
+
+    if journal is not None and journal.get(storage.parent_barcode) is not None:
+        return journal.get(storage.parent_barcode)
+
+    storage_id = post_parent_location(
         parent_barcode=storage.parent_barcode,
         parent_name=storage.parent_name,
         location_schema=parameters.freezer_schema,
         benchling_client=benchling_client
+    )[0]
+
+    if journal is not None:
+        journal.record(storage.parent_barcode, storage_id)
+    return storage_id
+
+
+def reconcile_existing(
+    storage: settings.StorageConfig,
+    benchling_client: Any,
+    journal: Optional[Journal] = None,
+) -> Journal:
+    "Mark storage that already exists under the parent as completed in the journal"
+
+    existing = reconcile.fetch_existing(benchling_client, storage.parent_barcode)
+    reconcile.summarize(hierarchy.iter_nodes(storage), existing)
+
+    journal = journal if journal is not None else Journal(None)
+    journal.preload(existing)
+    return journal
+
+
+def main(
+    storage: settings.StorageConfig,
+    parameters: Any,
+    benchling_client: Any,
+    box_schema: str,
+    journal: Optional[Journal] = None,
+    reconcile_with_tenant: bool = False,
+    output_path: str = "inventory_locations.csv",
+    shards: int = 1,
+    auth: Any = None,
+    index_path: Optional[str] = None,
+    cache_path: Optional[str] = None,
+) -> Counter:
+    """shards > 1 builds the subtrees below the parent location from that many worker
+    processes, each with its own session created from auth and the credential cache at
+    cache_path, see shard.py. Every run ends by writing the storage index,
+    <asset tag>.index.sqlite next to the csv unless index_path is given.
+    """
+
+    # The journal holds every key -> storage id the index is written from
+    journal = journal if journal is not None else Journal(None)
+
+    if reconcile_with_tenant:
+        journal = reconcile_existing(storage, benchling_client, journal)
+
+    # Create parent_location
+    top_parent_storage_id = create_parent_location(
+        storage, parameters, benchling_client, journal
     )
 
-    # Create shelves & racks within parent location
-    if storage.shelves != 0:
-        shelf = write_shelves(storage.shelves, storage.parent_barcode)
-        rack = write_racks_or_canes(
-            shelves=storage.shelves,
-            rack_prefix=storage.rack_prefix,
-            rack_in_full=storage.rack_in_full,
-            racks=storage.racks,
-            parent_barcode=storage.parent_barcode,
-            shelf_barcodes=shelf.barcodes,
-            mode="a",
+    if shards > 1:
+        completed, _ = shard.build_sharded(
+            storage,
+            parameters,
+            auth,
+            box_schema,
+            top_parent_storage_id,
+            shards,
+            journal=journal,
+            output_path=output_path,
+            cache_path=cache_path,
         )
+    else:
+        # The csv rows and the creates come from the same lazily generated stream, and
+        # each child is created as soon as its own parent exists
+        with sinks.CsvSink(output_path) as sink:
+            completed = pipeline.create_stream(
+                nodes=sink.tee(hierarchy.iter_nodes(storage)),
+                parent_barcode=storage.parent_barcode,
+                parent_storage_id=top_parent_storage_id,
+                benchling_client=benchling_client,
+                schemas=schemas_by_level(parameters, box_schema),
+                max_workers=parameters.max_workers,
+                journal=journal,
+            )
 
-        # create (shelf) child locations
-        shelf_storage_ids = post_child_location(
-            barcodes=shelf.barcodes,
-            names=shelf.names,
-            parent_storage_id=top_parent_storage_id,
-            location_schema=parameters.shelf_schema,
-            benchling_client=benchling_client
-        )
+    print(
+        f"{completed['box']} of {hierarchy.count_nodes(storage)['box']} boxes successfully created"
+    )
+    index.write_index(
+        index_path or index.default_path(storage, output_path), storage, journal.completed
+    )
 
-        # Create (rack/cane) child locations within shelves
-        rack_storage_ids = post_child_location(
-            barcodes=rack.barcodes,
-            names=rack.names,
-            parent_storage_id=shelf_storage_ids,
-            location_schema=parameters.rack_schema,
-            benchling_client=benchling_client
+    return completed
+
+
+async def main_async(
+    storage: settings.StorageConfig,
+    parameters: Any,
+    benchling_client: Any,
+    box_schema: str,
+    journal: Optional[Journal] = None,
+    reconcile_with_tenant: bool = False,
+    output_path: str = "inventory_locations.csv",
+    index_path: Optional[str] = None,
+) -> Counter:
+    "Same as main, for callers that already run an asyncio event loop"
+
+    journal = journal if journal is not None else Journal(None)
+
+    if reconcile_with_tenant:
+        journal = await asyncio.to_thread(
+            reconcile_existing, storage, benchling_client, journal
         )
 
-    # Create racks within parent for LN2 configuration
-    else:
-        rack = write_racks_or_canes(
-            shelves=storage.shelves,
-            rack_prefix=storage.rack_prefix,
-            rack_in_full=storage.rack_in_full,
-            racks=storage.racks,
+    top_parent_storage_id = await asyncio.to_thread(
+        create_parent_location, storage, parameters, benchling_client, journal
+    )
+
+    with sinks.CsvSink(output_path) as sink:
+        completed = await async_pipeline.create_stream(
+            nodes=sink.tee(hierarchy.iter_nodes(storage)),
             parent_barcode=storage.parent_barcode,
-            shelf_barcodes=0,
-            mode="w+",
-        )
-        rack_storage_ids = post_child_location(
-            barcodes=rack.barcodes,
-            names=rack.names,
             parent_storage_id=top_parent_storage_id,
-            location_schema=parameters.rack_schema,
-            benchling_client=benchling_client
+            benchling_client=benchling_client,
+            schemas=schemas_by_level(parameters, box_schema),
+            concurrency=parameters.max_workers,
+            journal=journal,
         )
 
-    # Create drawers within racks/canes
-    if storage.drawers != 0:
-        drawer = write_drawers_or_rows(
-            rack_barcodes=rack.barcodes,
-            prefix=parameters.drawer_prefix,
-            name_in_full=parameters.drawer_in_full,
-            drawers=storage.drawers,
-        )
-        drawer_storage_ids = post_child_location(
-            barcodes=drawer.barcodes,
-            names=drawer.names,
-            parent_storage_id=rack_storage_ids,
-            location_schema=parameters.drawer_schema,
-            benchling_client=benchling_client
-        )
+    print(
+        f"{completed['box']} of {hierarchy.count_nodes(storage)['box']} boxes successfully created"
+    )
+    await asyncio.to_thread(
+        index.write_index,
+        index_path or index.default_path(storage, output_path),
+        storage,
+        journal.completed,
+    )
 
-        # Create boxes within drawers
-        boxes_names = write_boxes(boxes=storage.boxes, barcodes=drawer.barcodes)
-        post_box(
-            box_names=boxes_names,
-            parent_storage_id=drawer_storage_ids,
-            schema=box_schema,
-            benchling_client=benchling_client
-        )
+    return completed
 
-    # Create boxes within racks/canes for LN2 configuration
-    else:
-        boxes_names = write_boxes(boxes=storage.boxes, barcodes=rack.barcodes)
-        post_box(
-            box_names=boxes_names,
-            parent_storage_id=rack_storage_ids,
-            schema=box_schema,
-            benchling_client=benchling_client
-        )
 
+def report_metrics(path: str, prometheus_path: Optional[str] = None) -> Dict[str, Any]:
+    "Save the run's API call metrics and print their summary"
 
-if __name__ == "__main__":
+    report = metrics.write_report(path, prometheus_path)
+    retries = sum(e["count"] for e in report["retries"])
+    print(
+        f"{report['objects']} objects in {report['elapsed_seconds']:.1f}s "
+        f"({report['objects_per_second']:.1f} objects/s), {retries} retries, "
+        f"{report['throttle_events']} throttle events, "
+        f"at most {report['max_in_flight']} calls in flight. Report: {path}"
+    )
+    return report
+
+
+def resumed(journal_path: Optional[str], resume: bool) -> int:
+    "Number of nodes a resumed run will skip"
+    return len(journal.load(journal_path)) if resume and journal_path else 0
 
-    parameters = settings.env_variables()
 
-    secret = secrets_manager.get_secret(secret_name=parameters.secret)
+def preflight(plans: List[planner.Plan], call_budget: Optional[int]) -> None:
+    try:
+        planner.preflight(plans, call_budget)
+    except planner.BudgetExceeded as e:
+        raise click.ClickException(f"{e}, raise --call_budget to run it anyway")
 
-    benchling_client = create_session(tenant=parameters.tenant, auth=secret)
 
-    storage = settings.collect_input.main(standalone_mode=False)
+def validate_schemas(
+    benchling_client: Any,
+    parameters: Any,
+    storages: List[settings.StorageConfig],
+    refresh: bool = False,
+) -> None:
+    "Check every schema the builds need before the first write"
+
+    registry = schemas.SchemaRegistry(benchling_client, parameters.tenant)
+    if refresh:
+        registry.refresh()
+    try:
+        registry.validate(schemas.required(storages, parameters))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@click.command()
+@click.option(
+    "--use_async",
+    is_flag=True,
+    default=False,
+    help="Create locations and boxes from a single asyncio event loop.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Skip every location and box already recorded in the journal of a previous run.",
+)
+@click.option(
+    "--overwrite_journal",
+    is_flag=True,
+    default=False,
+    help="Start over even though the journal holds the storage ids of an earlier run.",
+)
+@click.option(
+    "--journal_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Checkpoint journal, defaults to <asset tag>.journal.jsonl.",
+)
+@click.option(
+    "--reconcile",
+    "reconcile_with_tenant",
+    is_flag=True,
+    default=False,
+    help="Only create the locations and boxes that do not already exist under the asset tag.",
+)
+@click.option(
+    "--output",
+    "output_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help=(
+        "Csv output, gzip compressed when the path ends in .gz, defaults to "
+        "inventory_locations.csv (inventory_locations.dry_run.csv for a dry run)."
+    ),
+)
+@click.option(
+    "--index_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Barcode to storage id index written after the run, defaults to <asset tag>.index.sqlite.",
+)
+@click.option(
+    "--metrics_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help=(
+        "JSON run report of the API calls, defaults to <asset tag>.metrics.json "
+        "(<asset tag>.dry_run.metrics.json for a dry run)."
+    ),
+)
+@click.option(
+    "--prometheus_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Also write the run metrics as a Prometheus textfile.",
+)
+@click.option(
+    "--shards",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Worker processes building the shelf (or rack/cane) subtrees, each with its own session.",
+)
+@click.option(
+    "--no_credential_cache",
+    is_flag=True,
+    default=False,
+    help="Fetch the secret and a new access token instead of reusing the encrypted cache.",
+)
+@click.option(
+    "--dry_run",
+    is_flag=True,
+    default=False,
+    help="Run against an in-process Benchling stand-in, no credentials or network needed.",
+)
+@click.option(
+    "--dry_run_latency",
+    type=click.FloatRange(min=0),
+    default=0.05,
+    show_default=True,
+    help="Mean seconds per simulated call.",
+)
+@click.option(
+    "--dry_run_error_rate",
+    type=click.FloatRange(min=0, max=1),
+    default=0.0,
+    show_default=True,
+    help="Share of simulated calls answered with a 500.",
+)
+@click.option(
+    "--dry_run_throttle_rate",
+    type=click.FloatRange(min=0, max=1),
+    default=0.0,
+    show_default=True,
+    help="Share of simulated calls answered with a 429 and Retry-After.",
+)
+@click.option(
+    "--export_dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Only write per-level csv chunks and an upload manifest for the UI, no API calls.",
+)
+@click.option(
+    "--max_rows",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Rows per exported chunk file.",
+)
+@click.option(
+    "--max_bytes",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Bytes per exported chunk file.",
+)
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="YAML, JSON or CSV list of storage configurations to build without prompts.",
+)
+@click.option(
+    "--instance",
+    type=click.Choice(["dev", "test", "prod"], case_sensitive=False),
+    default=None,
+    help="Tenant instance, prompted for when omitted.",
+)
+@click.option(
+    "--parallel_freezers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Manifest freezers built at the same time.",
+)
+@click.option(
+    "--concurrency_budget",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Creates in flight across all freezers, defaults to the tenant's max_workers.",
+)
+@click.option(
+    "--output_dir",
+    type=click.Path(file_okay=False),
+    default=".",
+    show_default=True,
+    help="Where manifest builds write their csv and journal per freezer.",
+)
+@click.option(
+    "--refresh_schemas",
+    is_flag=True,
+    default=False,
+    help="List the tenant's schemas again instead of using the cached ones.",
+)
+@click.option(
+    "--plan_only",
+    is_flag=True,
+    default=False,
+    help="Print the pre-flight plan (objects, API calls, duration) and exit.",
+)
+@click.option(
+    "--call_budget",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Refuse plans over this many API calls, defaults to the tenant's call_budget.",
+)
+@click.option(
+    "--log_level",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR"], case_sensitive=False),
+    default="WARNING",
+    show_default=True,
+)
+@click.option(
+    "--log_format",
+    type=click.Choice(["json", "text"]),
+    default="json",
+    show_default=True,
+    help="JSON lines with contextual fields, or the plain text of earlier versions.",
+)
+@click.option(
+    "--log_sample",
+    multiple=True,
+    default=[],
+    help="LEVEL=RATE, keep that share of the level's records, e.g. DEBUG=0.01.",
+)
+def cli(
+    use_async,
+    resume,
+    overwrite_journal,
+    journal_path,
+    reconcile_with_tenant,
+    output_path,
+    index_path,
+    metrics_path,
+    prometheus_path,
+    shards,
+    no_credential_cache,
+    dry_run,
+    dry_run_latency,
+    dry_run_error_rate,
+    dry_run_throttle_rate,
+    export_dir,
+    max_rows,
+    max_bytes,
+    manifest,
+    instance,
+    parallel_freezers,
+    concurrency_budget,
+    output_dir,
+    refresh_schemas,
+    plan_only,
+    call_budget,
+    log_level,
+    log_format,
+    log_sample,
+):
+
+    if use_async and shards > 1:
+        raise click.UsageError("--shards cannot be combined with --use_async")
+    if dry_run and (manifest or shards > 1):
+        raise click.UsageError("--dry_run cannot be combined with --manifest or --shards")
+
+    try:
+        sample = {
+            level: float(rate) for level, rate in (e.split("=", 1) for e in log_sample)
+        }
+    except ValueError:
+        raise click.BadParameter("expected LEVEL=RATE", param_hint="--log_sample")
+    log.configure(level=log_level, format=log_format, sample=sample)
+
+    if manifest:
+        # Every entry is validated before any prompt, secret or request
+        try:
+            configs = batch.load_manifest(manifest)
+            batch.check_journals(configs, output_dir, resume, overwrite_journal)
+        except (ValueError, FileExistsError) as e:
+            raise click.ClickException(str(e))
+        parameters = settings.env_variables(instance)
+        log.bind(tenant=parameters.tenant)
+        preflight(
+            [
+                planner.plan(
+                    storage,
+                    parameters,
+                    existing=resumed(
+                        os.path.join(output_dir, f"{storage.parent_barcode}.journal.jsonl"),
+                        resume,
+                    ),
+                    latency=planner.measured_latency(
+                        metrics_path or os.path.join(output_dir, "metrics.json")
+                    ),
+                )
+                for storage in configs
+            ],
+            call_budget or parameters.call_budget,
+        )
+        if plan_only:
+            return
+        from src import credentials
+
+        cache = None if no_credential_cache else credentials.CredentialCache()
+        secret = credentials.get_secret(parameters.secret, cache)
+        throttle.configure(
+            max_concurrency=concurrency_budget or parameters.max_workers
+        )
+        benchling_client = create_session(
+            tenant=parameters.tenant, auth=secret, cache=cache, secret_name=parameters.secret
+        )
+        validate_schemas(benchling_client, parameters, configs, refresh_schemas)
+        # The report measures the build, not the prompts, plan and credential fetch
+        metrics.reset()
+        try:
+            batch.build_all(
+                configs,
+                parameters,
+                benchling_client,
+                parallel_freezers=parallel_freezers,
+                resume=resume,
+                output_dir=output_dir,
+                overwrite_journal=overwrite_journal,
+            )
+        finally:
+            # Also for failed freezers, the report shows what the others achieved
+            report_metrics(
+                metrics_path or os.path.join(output_dir, "metrics.json"), prometheus_path
+            )
+        return
+
+    if export_dir:
+        storage = settings.collect_input.main(args=[], standalone_mode=False)
+        offline.export_upload(storage, export_dir, max_rows=max_rows, max_bytes=max_bytes)
+        return
+
+    parameters = settings.env_variables(instance)
+    log.bind(tenant=parameters.tenant)
+
+    # args=[] keeps collect_input from parsing this command's own options
+    storage = settings.collect_input.main(args=[], standalone_mode=False)
+    log.bind(parent_barcode=storage.parent_barcode)
     box_schema = settings.box_schema_id(
         n_dimension=storage.box_dimension, tenant=parameters.tenant
     )
 
-    main()
+    if dry_run:
+        # Simulated ids and latencies must never end up where a real run resumes, looks
+        # them up or measures its latency from
+        journal_path = None
+        index_path = index_path or f"{storage.parent_barcode}.dry_run.index.sqlite"
+        metrics_path = metrics_path or f"{storage.parent_barcode}.dry_run.metrics.json"
+        output_path = output_path or "inventory_locations.dry_run.csv"
+    else:
+        journal_path = journal_path or f"{storage.parent_barcode}.journal.jsonl"
+        metrics_path = metrics_path or f"{storage.parent_barcode}.metrics.json"
+        output_path = output_path or "inventory_locations.csv"
+        try:
+            journal.check_overwrite(journal_path, resume, overwrite_journal)
+        except FileExistsError as e:
+            raise click.ClickException(f"{e} (--resume or --overwrite_journal)")
+
+    preflight(
+        [
+            planner.plan(
+                storage,
+                parameters,
+                existing=resumed(journal_path, resume),
+                reconcile_with_tenant=reconcile_with_tenant,
+                latency=(
+                    dry_run_latency if dry_run else planner.measured_latency(metrics_path)
+                ),
+            )
+        ],
+        call_budget or parameters.call_budget,
+    )
+    if plan_only:
+        return
+
+    if dry_run:
+        secret = cache = None
+        benchling_client = standin.FakeBenchling(
+            latency=dry_run_latency,
+            error_rate=dry_run_error_rate,
+            throttle_rate=dry_run_throttle_rate,
+        )
+    else:
+        from src import credentials
+
+        cache = None if no_credential_cache else credentials.CredentialCache()
+        secret = credentials.get_secret(parameters.secret, cache)
+        benchling_client = create_session(
+            tenant=parameters.tenant,
+            auth=secret,
+            cache=cache,
+            max_connections=parameters.max_workers,
+            secret_name=parameters.secret,
+        )
+    throttle.configure(max_concurrency=parameters.max_workers)
+    if not dry_run:
+        # The stand-in knows no schemas, dry runs accept any id
+        validate_schemas(benchling_client, parameters, [storage], refresh_schemas)
+
+    metrics.reset()
+    with Journal(journal_path, resume=resume, overwrite=overwrite_journal) as run_journal:
+        if use_async:
+            asyncio.run(
+                main_async(
+                    storage,
+                    parameters,
+                    benchling_client,
+                    box_schema,
+                    journal=run_journal,
+                    reconcile_with_tenant=reconcile_with_tenant,
+                    output_path=output_path,
+                    index_path=index_path,
+                )
+            )
+        else:
+            main(
+                storage,
+                parameters,
+                benchling_client,
+                box_schema,
+                journal=run_journal,
+                reconcile_with_tenant=reconcile_with_tenant,
+                output_path=output_path,
+                shards=shards,
+                auth=secret,
+                index_path=index_path,
+                cache_path=cache.path if cache is not None else None,
+            )
+
+    report_metrics(metrics_path, prometheus_path)
+
+    if dry_run:
+        print(
+            f"Dry run: {sum(benchling_client.calls.values())} simulated calls "
+            f"{dict(benchling_client.calls)}, errors {dict(benchling_client.errors)}"
+        )
+
+
+if __name__ == "__main__":
+    cli()
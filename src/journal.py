@@ -0,0 +1,125 @@
+"""Append-only checkpoint journal of created storage.
+
+Every created location or box is appended as one JSON line mapping its key (the barcode
+for locations, "<parent barcode>/<name>" for boxes) to its storage id. Lines are
+fsync'ed in batches so a crash loses at most one batch, and a resumed run skips every
+key already present.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+def load(path: str) -> Dict[str, str]:
+    "Read a journal, ignoring a last line left incomplete by a crash"
+
+    completed = {}
+    if not os.path.exists(path):
+        return completed
+
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            completed[entry["key"]] = entry["storage_id"]
+    return completed
+
+
+def check_overwrite(path: Optional[str], resume: bool, overwrite: bool) -> None:
+    "A journal holding an earlier run's storage ids is only replaced when asked to"
+
+    if path and not resume and not overwrite and os.path.exists(path):
+        if os.path.getsize(path) > 0:
+            raise FileExistsError(
+                f"{path} holds the storage ids of an earlier run, resume it or "
+                "overwrite it explicitly"
+            )
+
+
+def repair(path: str) -> None:
+    "Cut a last line left incomplete by a crash, so appended records start on a new line"
+
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        content = f.read()
+        if content and not content.endswith(b"\n"):
+            f.truncate(content.rfind(b"\n") + 1)
+
+
+class Journal:
+    """Without a path the journal only keeps the completed keys in memory. Without
+    resume, an existing non-empty journal is only replaced with overwrite.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        resume: bool = False,
+        sync_every: int = 100,
+        sync_interval: float = 1.0,
+        overwrite: bool = False,
+    ):
+        check_overwrite(path, resume, overwrite)
+        if resume and path:
+            repair(path)
+
+        self.path = path
+        self.resume = resume
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.completed = load(path) if resume and path else {}
+
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._file = open(path, "a" if resume else "w") if path else None
+
+    def get(self, key: str) -> Optional[str]:
+        return self.completed.get(key)
+
+    def preload(self, entries: Dict[str, str]) -> None:
+        "Mark entries as completed without writing them, e.g. storage found in the tenant"
+        with self._lock:
+            self.completed.update(entries)
+
+    def record(self, key: str, storage_id: str) -> None:
+        with self._lock:
+            self.completed[key] = storage_id
+            if self._file is None:
+                return
+            self._file.write(json.dumps({"key": key, "storage_id": storage_id}) + "\n")
+            self._unsynced += 1
+            if (
+                self._unsynced >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval
+            ):
+                self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,8 +1,205 @@
+"""Structured, non-blocking logging.
+
+Records are put on a queue and formatted and written by a QueueListener thread, so
+a log call on the hot path costs a level check, the sampling decision and an enqueue.
+Each record is one JSON object per line with the level, module, function, message
+and its contextual fields: those bound for the run (bind), those of the current
+context (context, e.g. the freezer of a batch worker) and the record's own
+(extra={"fields": {...}}). Levels can be sampled, e.g. {"DEBUG": 0.01} keeps one
+DEBUG record in a hundred.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+NAME = "src"
+TEXT_FORMAT = "%(asctime)s - %(levelname)s:%(funcName)s:%(lineno)s '%(message)s'"
+TEXT_DATEFMT = "%m/%d/%Y %I:%M:%S %p"
+
+_bound: Dict[str, Any] = {}
+_context: contextvars.ContextVar = contextvars.ContextVar("log_context", default={})
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    "One JSON object per record"
+
+    def format(self, record: logging.LogRecord) -> str:
+        # Fields come first, a field named like a record attribute cannot replace it
+        entry = {
+            **getattr(record, "fields", {}),
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    "The format of earlier versions, with the fields appended as key=value"
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", {})
+        if fields:
+            text += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return text
+
+
+class StderrHandler(logging.StreamHandler):
+    "Writes to the sys.stderr of the moment, which may be replaced after configure"
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self) -> TextIO:
+        return sys.stderr
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every 1/rate-th record of a sampled level, a rate of 0 drops the level.
+    The counters are not locked, under contention the rate is approximate.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.every = {
+            logging.getLevelName(level.upper()): max(1, round(1 / rate))
+            for level, rate in rates.items()
+            if rate > 0
+        }
+        self.dropped = {
+            logging.getLevelName(level.upper()) for level, rate in rates.items() if rate <= 0
+        }
+        self.seen: Dict[int, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno in self.dropped:
+            return False
+        every = self.every.get(record.levelno)
+        if every is None or every == 1:
+            return True
+        seen = self.seen.get(record.levelno, 0)
+        self.seen[record.levelno] = seen + 1
+        return seen % every == 0
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Adds the bound and context fields and enqueues the record unformatted, the
+    listener thread formats it
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        fields = {**_bound, **_context.get(), **getattr(record, "fields", {})}
+        record = logging.makeLogRecord(record.__dict__)
+        record.fields = fields
+        # Merged now, the arguments may change before the listener gets to them
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure(
+    level: str = "WARNING",
+    format: str = "json",
+    sample: Optional[Dict[str, float]] = None,
+    stream: Optional[TextIO] = None,
+) -> logging.Logger:
+    """(Re)configure the package logger, idempotent: a second call replaces the first
+    configuration instead of adding handlers
+    """
+    global _listener, _handler
+
+    with _lock:
+        shutdown()
+
+        output = StderrHandler() if stream is None else logging.StreamHandler(stream)
+        if format == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(TextFormatter(TEXT_FORMAT, datefmt=TEXT_DATEFMT))
+
+        _handler = ContextQueueHandler(queue.SimpleQueue())
+        if sample:
+            _handler.addFilter(SamplingFilter(sample))
+        _listener = logging.handlers.QueueListener(_handler.queue, output)
+        _listener.start()
+
+        package = logging.getLogger(NAME)
+        package.setLevel(level.upper())
+        package.addHandler(_handler)
+        package.propagate = False
+        return package
+
+
+def shutdown() -> None:
+    "Flush the queue and stop the writer thread"
+    global _listener, _handler
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger(NAME).removeHandler(_handler)
+        _handler = None
+
+
+atexit.register(shutdown)
+
+
+def bind(**fields: Any) -> None:
+    "Fields added to every record of the run, e.g. tenant"
+    _bound.update(fields)
+
+
+@contextlib.contextmanager
+def context(**fields: Any) -> Iterator[None]:
+    "Fields added to the records of the current thread or task within the block"
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current() -> Dict[str, Any]:
+    "Fields of the current context, see adopt"
+    return _context.get()
+
+
+def adopt(fields: Dict[str, Any]) -> None:
+    """Set the context of a worker thread, as the initializer of a ThreadPoolExecutor:
+    initializer=log.adopt, initargs=(log.current(),)
+    """
+    _context.set(fields)
 
 
-def logger():
-    logging.basicConfig(format="%(asctime)s - %(levelname)s:%(funcName)s:%(lineno)s '%(message)s'", datefmt='%m/%d/%Y %I:%M:%S %p')
-    logger = logging.getLogger(__name__)
+def logger() -> logging.Logger:
+    "The package logger, configured with the defaults on first use"
 
-    return logger
\ No newline at end of file
+    with _lock:
+        configured = _listener is not None
+    if not configured:
+        configure()
+    return logging.getLogger(NAME)
@@ -0,0 +1,268 @@
+"""Per-call metrics of a run.
+
+throttle.call records every attempt of every API call: its latency per endpoint and
+level in a fixed-bucket histogram, its outcome, retries and throttling, and the
+number of calls in flight. report() summarizes the run, with objects/s, as a dict
+that write_report saves as JSON, and optionally in the Prometheus text format as
+well, e.g. for the node_exporter textfile collector.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Upper bounds in seconds, the last bucket is +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(BUCKETS, seconds)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        "Estimate, interpolated linearly within the bucket the quantile falls in"
+
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = BUCKETS[index - 1] if index > 0 else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+
+class RunMetrics:
+    "Thread-safe, shared by every worker of a run"
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latency: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.outcomes: Counter = Counter()  # (endpoint, level, outcome)
+        self.retries: Counter = Counter()  # (endpoint, reason)
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.concurrency_limit = 0
+        self.connections: Counter = Counter()  # "reused" (pool hits) and "opened"
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint: str, level: str, seconds: float, outcome: str) -> None:
+        "One attempt, outcome is 'ok', an HTTP status code or an exception name"
+        with self._lock:
+            self.latency[(endpoint, level)].observe(seconds)
+            self.outcomes[(endpoint, level, outcome)] += 1
+
+    def retried(self, endpoint: str, reason: str) -> None:
+        with self._lock:
+            self.retries[(endpoint, reason)] += 1
+
+    def throttle_event(self, limit: int) -> None:
+        with self._lock:
+            self.throttled += 1
+            self.concurrency_limit = limit
+
+    def set_in_flight(self, in_flight: int, limit: int) -> None:
+        with self._lock:
+            self.in_flight = in_flight
+            self.max_in_flight = max(self.max_in_flight, in_flight)
+            self.concurrency_limit = limit
+
+    def connection(self, reused: bool) -> None:
+        "One HTTP request, sent on a kept-alive connection or on a new one"
+        with self._lock:
+            self.connections["reused" if reused else "opened"] += 1
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Sent back from a worker process, the lock stays behind
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def merge(self, *others: "RunMetrics") -> None:
+        """Add the calls of runs made at the same time as each other, e.g. by the worker
+        processes of a sharded build. Their in-flight calls and limits add up as well.
+        """
+        with self._lock:
+            for other in others:
+                for key, histogram in other.latency.items():
+                    merged = self.latency[key]
+                    merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                    merged.count += histogram.count
+                    merged.sum += histogram.sum
+                self.outcomes.update(other.outcomes)
+                self.retries.update(other.retries)
+                self.connections.update(other.connections)
+                self.throttled += other.throttled
+            self.max_in_flight = max(
+                self.max_in_flight, sum(other.max_in_flight for other in others)
+            )
+            self.concurrency_limit = max(
+                self.concurrency_limit, sum(other.concurrency_limit for other in others)
+            )
+
+    def objects(self) -> int:
+        "Successful creates"
+        return sum(
+            count
+            for (endpoint, _, outcome), count in self.outcomes.items()
+            if outcome == "ok" and endpoint.endswith(".create")
+        )
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            objects = self.objects()
+            calls = []
+            for (endpoint, level), histogram in sorted(self.latency.items()):
+                outcomes = {
+                    outcome: count
+                    for (e, l, outcome), count in self.outcomes.items()
+                    if (e, l) == (endpoint, level)
+                }
+                calls.append(
+                    {
+                        "endpoint": endpoint,
+                        "level": level,
+                        "attempts": histogram.count,
+                        "outcomes": outcomes,
+                        "seconds": round(histogram.sum, 3),
+                        "mean_ms": round(1000 * histogram.sum / histogram.count, 2),
+                        "p50_ms": round(1000 * histogram.quantile(0.5), 2),
+                        "p90_ms": round(1000 * histogram.quantile(0.9), 2),
+                        "p99_ms": round(1000 * histogram.quantile(0.99), 2),
+                    }
+                )
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "objects": objects,
+                "objects_per_second": round(objects / elapsed, 2) if elapsed else 0.0,
+                "calls": calls,
+                "retries": [
+                    {"endpoint": endpoint, "reason": reason, "count": count}
+                    for (endpoint, reason), count in sorted(self.retries.items())
+                ],
+                "throttle_events": self.throttled,
+                "max_in_flight": self.max_in_flight,
+                "concurrency_limit": self.concurrency_limit,
+                "connections": {
+                    "reused": self.connections["reused"],
+                    "opened": self.connections["opened"],
+                },
+            }
+
+    def prometheus(self) -> str:
+        "Metrics in the Prometheus text exposition format"
+
+        report = self.report()
+        lines: List[str] = [
+            "# HELP inventory_call_duration_seconds Latency of Benchling API call attempts",
+            "# TYPE inventory_call_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (endpoint, level), histogram in sorted(self.latency.items()):
+                labels = f'endpoint="{endpoint}",level="{level}"'
+                cumulative = 0
+                for bound, count in zip(list(BUCKETS) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f"inventory_call_duration_seconds_bucket"
+                        f'{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines += [
+                    f"inventory_call_duration_seconds_sum{{{labels}}} {histogram.sum}",
+                    f"inventory_call_duration_seconds_count{{{labels}}} {histogram.count}",
+                ]
+
+            lines += [
+                "# HELP inventory_call_attempts_total Benchling API call attempts by outcome",
+                "# TYPE inventory_call_attempts_total counter",
+            ]
+            for (endpoint, level, outcome), count in sorted(self.outcomes.items()):
+                lines.append(
+                    f'inventory_call_attempts_total{{endpoint="{endpoint}",level="{level}",'
+                    f'outcome="{outcome}"}} {count}'
+                )
+
+            lines += [
+                "# HELP inventory_retries_total Retried Benchling API calls by reason",
+                "# TYPE inventory_retries_total counter",
+            ]
+            for (endpoint, reason), count in sorted(self.retries.items()):
+                labels = f'endpoint="{endpoint}",reason="{reason}"'
+                lines.append(f"inventory_retries_total{{{labels}}} {count}")
+
+            lines += [
+                "# HELP inventory_connections_total HTTP requests by pooled connection use",
+                "# TYPE inventory_connections_total counter",
+            ]
+            for use in ("reused", "opened"):
+                count = self.connections[use]
+                lines.append(f'inventory_connections_total{{connection="{use}"}} {count}')
+
+        for name, kind, help_text, value in [
+            ("throttle_events_total", "counter", "429/503 responses", "throttle_events"),
+            ("max_in_flight", "gauge", "Most calls in flight at once", "max_in_flight"),
+            ("concurrency_limit", "gauge", "Adaptive concurrency limit", "concurrency_limit"),
+            ("objects_total", "counter", "Locations and boxes created", "objects"),
+            ("objects_per_second", "gauge", "Creates per second", "objects_per_second"),
+            ("elapsed_seconds", "gauge", "Duration of the run", "elapsed_seconds"),
+        ]:
+            name = f"inventory_{name}"
+            lines += [
+                f"# HELP {name} {help_text}",
+                f"# TYPE {name} {kind}",
+                f"{name} {report[value]}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+_metrics = RunMetrics()
+
+
+def reset() -> RunMetrics:
+    "Start a new run"
+    global _metrics
+    _metrics = RunMetrics()
+    return _metrics
+
+
+def current() -> RunMetrics:
+    return _metrics
+
+
+def _write(path: str, text: str) -> None:
+    "Atomic, a textfile collector never reads a partial file"
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def write_report(path: str, prometheus_path: Optional[str] = None) -> Dict[str, Any]:
+    "Save the run report as JSON, and as a Prometheus textfile when a path is given"
+
+    report = _metrics.report()
+    _write(path, json.dumps(report, indent=2))
+    if prometheus_path:
+        _write(prometheus_path, _metrics.prometheus())
+    return report
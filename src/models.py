@@ -1,8 +1,76 @@
-from typing import List, Union
+from typing import List, Literal, NamedTuple, Optional, Union
 
-from pydantic import BaseModel
 
+LEVELS = ("parent", "shelf", "rack", "drawer", "box")
+SHELF_PREFIX = "S"
+SHELF_NAME = "Shelf"
+BOX_NAME = "Box"
 
-class Location(BaseModel):
-    barcodes: Union[str, List[str]]
-    names: List[str]
+
+class Location:
+    "Barcodes and names of one level, as returned by the write_* functions"
+
+    # Plain slots instead of a pydantic model, inputs are validated once by StorageConfig
+    __slots__ = ("barcodes", "names")
+
+    def __init__(self, barcodes: Union[str, List[str]], names: List[str]):
+        self.barcodes = barcodes
+        self.names = names
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Location):
+            return NotImplemented
+        return self.barcodes == other.barcodes and self.names == other.names
+
+    def __repr__(self) -> str:
+        return f"Location(barcodes={self.barcodes!r}, names={self.names!r})"
+
+
+def box_key(parent_barcode: str, name: str) -> str:
+    "Boxes get autogenerated barcodes, so they are identified by parent barcode and name"
+    return f"{parent_barcode}/{name}"
+
+
+def child_barcode(parent_barcode: str, prefix: str, ordinal: int) -> str:
+    "Barcode of the ordinal-th child of a location, e.g. EQS-1234-S1 + R, 2 -> EQS-1234-S1-R2"
+    return f"{parent_barcode}-{prefix}{ordinal}"
+
+
+def child_name(name_in_full: str, ordinal: int) -> str:
+    "Name of the ordinal-th child of a location, e.g. Rack, 2 -> Rack 2"
+    return f"{name_in_full} {ordinal}"
+
+
+def active_levels(storage) -> List[int]:
+    "LEVELS indices that have nodes for a StorageConfig, a level with no nodes is skipped"
+
+    fanout = [storage.shelves, storage.racks, storage.drawers, storage.boxes]
+    levels = [depth for depth, count in enumerate(fanout, start=1) if count]
+    if not storage.racks:
+        levels = [depth for depth in levels if depth < 2]  # Nothing goes below shelves
+    return levels
+
+
+class Node(NamedTuple):
+    "One location or box below the parent location, as yielded by hierarchy.iter_nodes"
+    level: Literal["shelf", "rack", "drawer", "box"]
+    parent_barcode: str
+    barcode: Optional[str]  # None for boxes, Benchling autogenerates them
+    name: str
+
+    @property
+    def key(self) -> str:
+        "Barcode of a location, box_key of a box, used to journal and look up nodes"
+        if self.barcode is not None:
+            return self.barcode
+        return box_key(self.parent_barcode, self.name)
+
+
+class IndexEntry(NamedTuple):
+    "One row of the storage index written after every run, see index.py"
+    key: str
+    storage_id: str
+    parent_key: Optional[str]  # None for the parent location
+    parent_id: Optional[str]
+    level: str
+    name: str
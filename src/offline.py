@@ -0,0 +1,94 @@
+"""CSV-only entry point, no API calls.
+
+Only the settings, the hierarchy generators and the csv writers are imported, neither
+benchling_sdk nor boto3, so it starts quickly and runs without credentials or network.
+
+    python -m src.offline --output inventory_locations.csv
+    python -m src.offline --export_dir exports
+"""
+
+from typing import Optional
+
+import click
+
+from src import export
+from src import hierarchy
+from src import log
+from src import settings
+from src import sinks
+
+
+logger = log.logger()
+
+
+def write_csv(storage: settings.StorageConfig, output_path: str) -> int:
+    "Write the whole hierarchy to one csv and return the number of rows"
+    logger.info("initiated")
+
+    with sinks.CsvSink(output_path) as sink:
+        for node in hierarchy.iter_nodes(storage):
+            sink.write(node)
+        return sink.rows
+
+
+def export_upload(
+    storage: settings.StorageConfig,
+    export_dir: str,
+    max_rows: int = 1000,
+    max_bytes: Optional[int] = None,
+) -> str:
+    "Write per-level csv chunks and their upload manifest, see export.py"
+
+    manifest = export.export_chunks(
+        hierarchy.iter_nodes(storage),
+        export_dir,
+        max_rows=max_rows,
+        max_bytes=max_bytes,
+    )
+    print(f"Upload the files in the order listed in {manifest}")
+    return manifest
+
+
+@click.command()
+@click.option(
+    "--output",
+    "output_path",
+    type=click.Path(dir_okay=False),
+    default="inventory_locations.csv",
+    show_default=True,
+    help="Csv output, gzip compressed when the path ends in .gz.",
+)
+@click.option(
+    "--export_dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Write per-level csv chunks and an upload manifest for the UI instead.",
+)
+@click.option(
+    "--max_rows",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Rows per exported chunk file.",
+)
+@click.option(
+    "--max_bytes",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Bytes per exported chunk file.",
+)
+def cli(output_path, export_dir, max_rows, max_bytes):
+
+    # args=[] keeps collect_input from parsing this command's own options
+    storage = settings.collect_input.main(args=[], standalone_mode=False)
+
+    if export_dir:
+        export_upload(storage, export_dir, max_rows=max_rows, max_bytes=max_bytes)
+        return
+
+    rows = write_csv(storage, output_path)
+    print(f"{rows} locations and boxes written to {output_path}")
+
+
+if __name__ == "__main__":
+    cli()
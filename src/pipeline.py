@@ -0,0 +1,250 @@
+"""Dependency-driven creation of a storage hierarchy.
+
+Instead of creating every shelf, then every rack, then every drawer, a node's children
+are queued as soon as that node's storage id comes back. Branches overlap and the
+wall-clock time approaches the latency of the deepest path rather than the sum of
+the levels. Nodes are pulled lazily from hierarchy.iter_nodes, so only a bounded
+window of the hierarchy is held in memory at once.
+
+Creates are not idempotent, and the throttle retries them after a 5xx or a timeout
+that may have come after the tenant committed the object. A retried location create
+whose barcode conflicts looks the location up by its barcode, and a retried box create
+first looks for the box under its parent, so nothing is created twice.
+"""
+
+import logging
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from src import log
+from src import models
+from src import reconcile
+from src import throttle
+from src.journal import Journal
+
+if TYPE_CHECKING:
+    from benchling_sdk import models as benchling_models
+
+
+logger = log.logger()
+
+CONFLICT_STATUS_CODES = {400, 409}  # A barcode already in use
+
+
+def node_create(
+    node: models.Node, schema_id: str, parent_storage_id: str
+) -> Union["benchling_models.BoxCreate", "benchling_models.LocationCreate"]:
+    "Request body for a single location or box"
+
+    # The generated SDK models are slow to import, see inventory_builder
+    from benchling_sdk import models as benchling_models
+
+    if node.barcode is None:
+        return benchling_models.BoxCreate(
+            name=node.name,
+            schema_id=schema_id,
+            parent_storage_id=parent_storage_id,
+        )
+    return benchling_models.LocationCreate(
+        name=node.name,
+        schema_id=schema_id,
+        barcode=node.barcode,
+        parent_storage_id=parent_storage_id,
+    )
+
+
+def find_location(
+    create: "benchling_models.LocationCreate", benchling_client: Any
+) -> Optional[Any]:
+    "The location an earlier attempt of create committed, barcodes are unique"
+
+    # Reading an unset field of an SDK model raises, its json body omits the field
+    parent_storage_id = create.to_dict().get("parentStorageId")
+    location = benchling_client.locations.list(barcodes=[create.barcode]).first()
+    if (
+        location is not None
+        and location.parent_storage_id == parent_storage_id
+        and location.name == create.name
+    ):
+        return location
+    return None
+
+
+def find_box(create: "benchling_models.BoxCreate", benchling_client: Any) -> Optional[Any]:
+    "The box an earlier attempt of create committed, box names are unique per parent"
+
+    for box in reconcile.flatten(
+        benchling_client.boxes.list(
+            ancestor_storage_id=create.parent_storage_id, page_size=reconcile.PAGE_SIZE
+        )
+    ):
+        if box.parent_storage_id == create.parent_storage_id and box.name == create.name:
+            return box
+    return None
+
+
+def post_create(
+    create: Union["benchling_models.BoxCreate", "benchling_models.LocationCreate"],
+    benchling_client: Any,
+    level: Optional[str] = None,
+) -> str:
+    """POST a box or location through the shared throttle and return its storage id.
+    level labels the call in the run metrics, e.g. "rack". A retried attempt returns
+    the object an earlier attempt committed instead of creating it again.
+    """
+
+    from benchling_sdk import models as benchling_models
+    from benchling_sdk.errors import BenchlingError
+
+    attempts = []
+
+    def create_box() -> Any:
+        # Nothing conflicts with a second box of the same name, look for it first
+        if attempts:
+            box = find_box(create, benchling_client)
+            if box is not None:
+                return box
+        attempts.append(True)
+        return benchling_client.boxes.create(box=create)
+
+    def create_location() -> Any:
+        retried = bool(attempts)
+        attempts.append(True)
+        try:
+            return benchling_client.locations.create(location=create)
+        except BenchlingError as error:
+            if retried and error.status_code in CONFLICT_STATUS_CODES:
+                location = find_location(create, benchling_client)
+                if location is not None:
+                    return location
+            raise
+
+    if isinstance(create, benchling_models.BoxCreate):
+        return throttle.call(create_box, endpoint="boxes.create", level=level or "box").id
+    return throttle.call(
+        create_location, endpoint="locations.create", level=level or "location"
+    ).id
+
+
+def create_node(
+    node: models.Node,
+    schema_id: str,
+    parent_storage_id: str,
+    benchling_client: Any,
+    journal: Optional[Journal] = None,
+) -> str:
+    "POST a single location or box, journaling its storage id under node.key"
+
+    started = time.perf_counter()
+    storage_id = post_create(
+        node_create(node, schema_id, parent_storage_id), benchling_client, level=node.level
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "created",
+            extra={
+                "fields": {
+                    "storage_level": node.level,
+                    "barcode": node.barcode,
+                    "key": node.key,
+                    "storage_id": storage_id,
+                    "latency": round(time.perf_counter() - started, 4),
+                }
+            },
+        )
+    if journal is not None:
+        journal.record(node.key, storage_id)
+    return storage_id
+
+
+def create_stream(
+    nodes: Iterable[models.Node],
+    parent_barcode: str,
+    parent_storage_id: str,
+    benchling_client: Any,
+    schemas: Dict[str, str],
+    max_workers: int,
+    journal: Optional[Journal] = None,
+    max_buffered: Optional[int] = None,
+) -> Counter:
+    """Create every node below parent_barcode, starting children as soon as their parent
+    exists. Nodes already in the journal are skipped. At most max_buffered nodes are
+    pulled from the stream ahead of completion.
+
+    returns:
+        Number of completed (created or skipped) nodes per level
+    """
+    logger.info("initiated")
+
+    max_buffered = max_buffered or 4 * max_workers
+    storage_ids = {parent_barcode: parent_storage_id}  # Locations only
+    waiting: Dict[str, List[models.Node]] = defaultdict(list)
+    ready: List[Tuple[models.Node, str]] = []  # With their parent's storage id
+    pending: Dict[Future, models.Node] = {}
+    completed: Counter = Counter()
+    buffered = 0
+    nodes = iter(nodes)
+    exhausted = False
+
+    def resolve(node: models.Node, storage_id: str) -> None:
+        nonlocal buffered
+        buffered -= 1
+        completed[node.level] += 1
+        if node.barcode is not None:
+            storage_ids[node.barcode] = storage_id
+            for child in waiting.pop(node.barcode, []):
+                schedule(child)
+
+    def schedule(node: models.Node) -> None:
+        existing = journal.get(node.key) if journal is not None else None
+        if existing is not None:
+            resolve(node, existing)
+        else:
+            ready.append((node, storage_ids[node.parent_barcode]))
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, initializer=log.adopt, initargs=(log.current(),)
+    ) as pool:
+        try:
+            while True:
+                while not exhausted and buffered < max_buffered:
+                    node = next(nodes, None)
+                    if node is None:
+                        exhausted = True
+                        break
+                    buffered += 1
+                    if node.parent_barcode in storage_ids:
+                        schedule(node)
+                    else:
+                        waiting[node.parent_barcode].append(node)
+
+                for node, parent_id in ready:
+                    future = pool.submit(
+                        create_node,
+                        node,
+                        schemas[node.level],
+                        parent_id,
+                        benchling_client,
+                        journal,
+                    )
+                    pending[future] = node
+                ready.clear()
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    resolve(pending.pop(future), future.result())
+        except BaseException:
+            # Do not keep creating children of a tree that is already failing
+            for future in pending:
+                future.cancel()
+            raise
+
+    if waiting:
+        raise ValueError(f"No parent location for: {sorted(waiting)}")
+
+    return completed
@@ -0,0 +1,146 @@
+"""Pre-flight plan of a build, before its first request.
+
+The StorageConfig is expanded into exact per-level counts with hierarchy.count_nodes,
+and from those the API calls of the run: one POST per location and box, as Benchling
+has no bulk create endpoint, plus the list calls of a reconcile. The wall-clock
+estimate takes the per-call latency, measured by an earlier run's metrics report when
+there is one, and the concurrency: the calls are spread over the workers, but no run
+is faster than one call per level of its deepest path, nor than the tenant's rate
+limit allows.
+"""
+
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from src import hierarchy
+from src import log
+from src import reconcile
+from src import settings
+
+
+logger = log.logger()
+
+DEFAULT_LATENCY = 0.25  # Seconds per create when no earlier run was measured
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class Plan(BaseModel):
+    parent_barcode: str
+    objects: Dict[str, int]  # Per level, including the parent location
+    existing: int
+    creates: int
+    list_calls: int
+    concurrency: int
+    latency: float
+    seconds: float
+    warnings: List[str] = []
+
+    @property
+    def calls(self) -> int:
+        return self.creates + self.list_calls
+
+
+def measured_latency(metrics_path: Optional[str]) -> Optional[float]:
+    "Mean seconds per create attempt in an earlier run's metrics report, see metrics.py"
+
+    if metrics_path is None or not os.path.exists(metrics_path):
+        return None
+    try:
+        with open(metrics_path) as f:
+            calls = [e for e in json.load(f)["calls"] if e["endpoint"].endswith(".create")]
+    except (ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable metrics report {metrics_path}: {e}")
+        return None
+
+    attempts = sum(e["attempts"] for e in calls)
+    return sum(e["seconds"] for e in calls) / attempts if attempts else None
+
+
+def plan(
+    storage: settings.StorageConfig,
+    parameters: Any,
+    existing: int = 0,
+    reconcile_with_tenant: bool = False,
+    latency: Optional[float] = None,
+) -> Plan:
+    """existing is the number of nodes already created, e.g. journaled by an earlier
+    run that is resumed
+    """
+
+    objects = {"parent": 1, **hierarchy.count_nodes(storage)}
+    total = sum(objects.values())
+    creates = max(0, total - existing)
+    if latency is None:
+        latency = DEFAULT_LATENCY
+    concurrency = parameters.max_workers
+
+    list_calls = 0
+    if reconcile_with_tenant:
+        # The parent lookup, then every page of locations and of boxes
+        locations = total - objects.get("box", 0)
+        list_calls = (
+            1
+            + math.ceil(locations / reconcile.PAGE_SIZE)
+            + math.ceil(objects.get("box", 0) / reconcile.PAGE_SIZE)
+        )
+
+    # Every level of the deepest path waits for the one above it
+    rounds = 0
+    if creates:
+        depth = len([count for count in objects.values() if count])
+        rounds = max(math.ceil(creates / concurrency), depth)
+    seconds = (list_calls + rounds) * latency
+
+    warnings = []
+    if parameters.rate_limit is not None:
+        if concurrency > parameters.rate_limit * latency:
+            warnings.append(
+                f"{concurrency} workers at {latency:.2f}s per call exceed the rate limit "
+                f"of {parameters.rate_limit:g} calls/s, expect throttling"
+            )
+        seconds = max(seconds, (creates + list_calls) / parameters.rate_limit)
+
+    return Plan(
+        parent_barcode=storage.parent_barcode,
+        objects=objects,
+        existing=existing,
+        creates=creates,
+        list_calls=list_calls,
+        concurrency=concurrency,
+        latency=latency,
+        seconds=seconds,
+        warnings=warnings,
+    )
+
+
+def preflight(plans: List[Plan], call_budget: Optional[int]) -> None:
+    "Print the plans, raise BudgetExceeded when together they need over call_budget calls"
+
+    for e in plans:
+        report(e)
+
+    calls = sum(e.calls for e in plans)
+    if call_budget is not None and calls > call_budget:
+        raise BudgetExceeded(
+            f"The plan needs {calls} API calls, over the budget of {call_budget}"
+        )
+
+
+def report(plan: Plan) -> None:
+    counts = ", ".join(f"{count} {level}" for level, count in plan.objects.items() if count)
+    minutes, seconds = divmod(round(plan.seconds), 60)
+    print(f"Plan for {plan.parent_barcode}: {counts}")
+    print(
+        f"{plan.creates} creates ({plan.existing} already exist), "
+        f"{plan.list_calls} list calls, about {minutes}m{seconds:02d}s "
+        f"at {plan.latency:.2f}s per call and {plan.concurrency} workers"
+    )
+    for warning in plan.warnings:
+        print(f"Warning: {warning}")
@@ -0,0 +1,80 @@
+"""Diff the planned hierarchy against what already exists in the tenant.
+
+The parent location, every location below it and every box below it are listed with
+paginated calls into an in-memory barcode index. Keys match models.Node.key and the
+journal, so preloading the index into the run's journal makes the pipelines create
+only the missing nodes.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+from src import log
+from src import models
+
+
+logger = log.logger()
+
+PAGE_SIZE = 100  # Largest page the Benchling list endpoints accept
+
+
+def flatten(pages: Iterable[List[Any]]) -> Iterable[Any]:
+    for page in pages:
+        yield from page
+
+
+def fetch_existing(
+    benchling_client: Any, parent_barcode: str, page_size: int = PAGE_SIZE
+) -> Dict[str, str]:
+    """Index the existing (unarchived) storage under parent_barcode.
+
+    returns:
+        {barcode or box key: storage id}, empty when the parent does not exist yet
+    """
+    logger.info("initiated")
+
+    parent = benchling_client.locations.list(barcodes=[parent_barcode]).first()
+    if parent is None:
+        return {}
+
+    index = {parent_barcode: parent.id}
+    barcode_by_id = {parent.id: parent_barcode}
+
+    for location in flatten(
+        benchling_client.locations.list(
+            ancestor_storage_id=parent.id, page_size=page_size
+        )
+    ):
+        index[location.barcode] = location.id
+        barcode_by_id[location.id] = location.barcode
+
+    for box in flatten(
+        benchling_client.boxes.list(ancestor_storage_id=parent.id, page_size=page_size)
+    ):
+        parent_box_barcode = barcode_by_id.get(box.parent_storage_id)
+        if parent_box_barcode is not None:
+            index[models.box_key(parent_box_barcode, box.name)] = box.id
+
+    return index
+
+
+def summarize(nodes: Iterable[models.Node], existing: Dict[str, str]) -> Counter:
+    """Print how many nodes of each level already exist.
+
+    returns:
+        Number of nodes per level that still have to be created
+    """
+
+    planned: Counter = Counter()
+    missing: Counter = Counter()
+    for node in nodes:
+        planned[node.level] += 1
+        if node.key not in existing:
+            missing[node.level] += 1
+
+    for level, count in planned.items():
+        print(
+            f"{level.capitalize()}: {count - missing[level]} of {count} already exist, "
+            f"{missing[level]} to create"
+        )
+    return missing
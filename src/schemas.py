@@ -0,0 +1,150 @@
+"""Registry of the tenant's location and box schemas.
+
+The location and box schemas are listed once, both at the same time, and cached on
+disk per tenant with a TTL, so repeated runs do not list them again. Before any write,
+validate checks every schema id a build needs (the parent, each level in use and
+the box schema of its dimension) against the registry and reports all the unknown
+ones at once. A wrong id then fails the run before the parent location is created.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from src import hierarchy
+from src import log
+from src import reconcile
+from src import settings
+from src import throttle
+
+
+logger = log.logger()
+
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "benchling-inventory", "schemas.json"
+)
+TTL = 24 * 3600.0
+KINDS = ("location", "box")
+
+
+class UnknownSchema(ValueError):
+    pass
+
+
+class SchemaRegistry:
+    "Schema id -> name per kind, from the disk cache while it is fresh"
+
+    def __init__(
+        self,
+        benchling_client: Any,
+        tenant: str,
+        path: Optional[str] = DEFAULT_PATH,
+        ttl: float = TTL,
+    ):
+        """Without a path nothing is cached on disk"""
+        self.benchling_client = benchling_client
+        self.tenant = tenant
+        self.path = path
+        self.ttl = ttl
+        self._schemas: Optional[Dict[str, Dict[str, str]]] = None
+        self._cached = False
+
+    def _list(self, kind: str) -> Dict[str, str]:
+        list_schemas = getattr(self.benchling_client.schemas, f"list_{kind}_schemas")
+
+        def fetch() -> Dict[str, str]:
+            # Pages are requested while iterating, within the throttled call
+            pages = list_schemas(page_size=reconcile.PAGE_SIZE)
+            return {e.id: e.name for e in reconcile.flatten(pages)}
+
+        return throttle.call(fetch, endpoint=f"schemas.list_{kind}", level="schema")
+
+    def _read(self) -> Dict[str, Any]:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"Ignoring unreadable schema cache {self.path}")
+            return {}
+
+    def _write(self, schemas: Dict[str, Dict[str, str]]) -> None:
+        if self.path is None:
+            return
+        cached = self._read()
+        cached[self.tenant] = {"fetched": time.time(), "schemas": schemas}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(cached, f)
+        os.replace(temporary, self.path)
+
+    def refresh(self) -> Dict[str, Dict[str, str]]:
+        "List every kind from the tenant, in parallel, and cache the result"
+        logger.info("initiated")
+
+        with ThreadPoolExecutor(max_workers=len(KINDS)) as pool:
+            schemas = dict(zip(KINDS, pool.map(self._list, KINDS)))
+        self._write(schemas)
+        self._schemas = schemas
+        self._cached = False
+        return schemas
+
+    def schemas(self) -> Dict[str, Dict[str, str]]:
+        if self._schemas is None:
+            entry = self._read().get(self.tenant)
+            if entry is not None and time.time() - entry["fetched"] < self.ttl:
+                self._schemas = entry["schemas"]
+                self._cached = True
+            else:
+                self.refresh()
+        return self._schemas
+
+    def name(self, kind: str, schema_id: str) -> Optional[str]:
+        return self.schemas()[kind].get(schema_id)
+
+    def validate(self, required: Dict[str, Dict[str, str]]) -> None:
+        """required is {kind: {role: schema id}}, e.g. {"location": {"rack": "locsch_..."}}.
+        A miss in a cached registry refreshes it once, the schema may be new.
+        """
+        missing = self._missing(required)
+        if missing and self._cached:
+            self.refresh()
+            missing = self._missing(required)
+        if missing:
+            raise UnknownSchema(
+                f"Unknown schemas on {self.tenant}: " + ", ".join(missing)
+            )
+
+    def _missing(self, required: Dict[str, Dict[str, str]]) -> List[str]:
+        return [
+            f"{role} {kind} schema {schema_id}"
+            for kind, roles in required.items()
+            for role, schema_id in roles.items()
+            if self.name(kind, schema_id) is None
+        ]
+
+
+def required(
+    storages: Iterable[settings.StorageConfig], parameters: Any
+) -> Dict[str, Dict[str, str]]:
+    "Every schema the builds of storages need, {kind: {role: schema id}}"
+
+    locations = {"parent": parameters.freezer_schema}
+    boxes = {}
+    for storage in storages:
+        counts = hierarchy.count_nodes(storage)
+        for level in ("shelf", "rack", "drawer"):
+            if counts[level]:
+                locations[level] = getattr(parameters, f"{level}_schema")
+        if counts["box"]:
+            box_schema = settings.box_schema_id(
+                n_dimension=storage.box_dimension, tenant=parameters.tenant
+            )
+            boxes[f"dimension {storage.box_dimension}"] = box_schema
+    return {"location": locations, "box": boxes}
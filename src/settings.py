@@ -1,8 +1,8 @@
 from typing import Any
-from typing import Literal, Optional, Union
+from typing import Dict, Literal, Optional, Tuple, Union
 
 import click
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, field_validator, model_validator
 
 
 class DevelopmentSettings(BaseModel):
@@ -12,6 +12,9 @@ class DevelopmentSettings(BaseModel):
     rack_schema: str = "dev_rack_schema"
     drawer_schema: str = "dev_drawer_schema"
     secret: str = "benchling-inventory"
+    max_workers: int = 8
+    rate_limit: Optional[float] = None  # Calls per second the tenant allows
+    call_budget: Optional[int] = None  # Most API calls a single run may plan
 
 
 class TestSettings(BaseModel):
@@ -21,6 +24,9 @@ class TestSettings(BaseModel):
     rack_schema: str = "test_rack_schema"
     drawer_schema: str = "test_drawer_schema"
     secret: str = "benchling-inventory"
+    max_workers: int = 8
+    rate_limit: Optional[float] = None  # Calls per second the tenant allows
+    call_budget: Optional[int] = None  # Most API calls a single run may plan
 
 
 class ProductionSettings(BaseModel):
@@ -30,6 +36,14 @@ class ProductionSettings(BaseModel):
     rack_schema: str = "prod_rack_schema"
     drawer_schema: str = "prod_drawer_schema"
     secret: str = "benchling-inventory"
+    max_workers: int = 8
+    rate_limit: Optional[float] = None  # Calls per second the tenant allows
+    call_budget: Optional[int] = None  # Most API calls a single run may plan
+
+
+RACK_NAMES = {"R": "Rack", "C": "Cane"}
+DRAWER_NAMES = {"D": "Drawer", "R": "Row"}
+BOX_DIMENSIONS = {1: "9x9", 2: "10x10"}
 
 
 class StorageConfig(BaseModel):
@@ -39,8 +53,8 @@ class StorageConfig(BaseModel):
     rack_prefix: Literal["R", "C"]
     rack_in_full: Literal["Rack", "Cane"]
     racks: int
-    drawer_prefix: Optional[Literal["D", "R"]]
-    drawer_in_full: Optional[Literal["Drawer", "Row"]]
+    drawer_prefix: Optional[Literal["D", "R"]] = None
+    drawer_in_full: Optional[Literal["Drawer", "Row"]] = None
     drawers: int
     boxes: int
     box_dimension: int
@@ -53,9 +67,42 @@ class StorageConfig(BaseModel):
             )
         return value
 
+    @field_validator("box_dimension")
+    def validate_box_dimension(cls, value):
+        if value not in BOX_DIMENSIONS:
+            raise ValueError(f"box_dimension must be 1 (9x9) or 2 (10x10), got: {value}")
+        return value
+
+    @model_validator(mode="after")
+    def validate_prefixes(self):
+        "Prefixes must match their names, and drawers/rows need both"
+
+        if RACK_NAMES[self.rack_prefix] != self.rack_in_full:
+            raise ValueError(
+                f"rack_prefix {self.rack_prefix} does not match "
+                f"rack_in_full {self.rack_in_full}"
+            )
+        if (self.drawer_prefix is None) != (self.drawer_in_full is None):
+            raise ValueError("drawer_prefix and drawer_in_full must be given together")
+        if self.drawer_prefix is not None and (
+            DRAWER_NAMES[self.drawer_prefix] != self.drawer_in_full
+        ):
+            raise ValueError(
+                f"drawer_prefix {self.drawer_prefix} does not match "
+                f"drawer_in_full {self.drawer_in_full}"
+            )
+        if self.drawers and self.drawer_prefix is None:
+            raise ValueError(
+                f"{self.drawers} drawers need drawer_prefix and drawer_in_full"
+            )
+        return self
 
-def env_variables() -> Union[DevelopmentSettings, TestSettings, ProductionSettings]:
+
+def env_variables(
+    instance: Optional[Literal["dev", "test", "prod"]] = None,
+) -> Union[DevelopmentSettings, TestSettings, ProductionSettings]:
     """Based on user input, return env variables to prepare storage configuration.
+    The prompt is skipped when instance is given.
 
     returns:
         DevelopmentSettings, TestSettings or Production Settings(
@@ -68,8 +115,6 @@ def env_variables() -> Union[DevelopmentSettings, TestSettings, ProductionSettin
         )
     """
 
-    instance = None
-
     while instance is None:
         instance = click.prompt(
             "\nSpecify the instance",
@@ -200,28 +245,26 @@ def collect_input(racks_prompt, drawers_prompt) -> StorageConfig:
     )
 
 
+# (tenant, box dimension choice of collect_input) -> box schema id
+BOX_SCHEMAS: Dict[Tuple[str, int], str] = {
+    ("orgdev", 1): "boxsch_xyz789",  # 9x9 boxes
+    ("orgdev", 2): "boxsch_xyz987",  # 10x10 boxes
+    ("orgtest", 1): "boxsch_xyz123",  # 9x9 boxes
+    ("orgtest", 2): "boxsch_xyz456",  # 10x10 boxes
+    ("org", 1): "boxsch_abc123",  # 9x9 boxes
+    ("org", 2): "boxsch_abc456",  # 10x10 boxes
+}
+
+
 def box_schema_id(
     n_dimension: int,
     tenant: Literal["orgdev", "orgtest", "org"],
 ) -> str:
     """Based on collect_input, return the schema_id for the box dimension and instance."""
 
-    if n_dimension == 1 and tenant == "orgdev":
-        schema = "boxsch_xyz789"  # 9x9 boxes
-
-    elif n_dimension == 2 and tenant == "orgdev":
-        schema = "boxsch_xyz987"  # 10x10 boxes
-
-    elif n_dimension == 1 and tenant == "orgtest":
-        schema = "boxsch_xyz123"  # 9x9 boxes
-
-    elif n_dimension == 2 and tenant == "orgtest":
-        schema = "boxsch_xyz456"  # 10x10 boxes
-
-    elif n_dimension == 1 and tenant == "org":
-        schema = "boxsch_abc123"  # 9x9 boxes
-
-    elif n_dimension == 2 and tenant == "org":
-        schema = "boxsch_abc456"  # 10x10 boxes
-
-    return schema
+    try:
+        return BOX_SCHEMAS[(tenant, n_dimension)]
+    except KeyError:
+        raise ValueError(
+            f"No box schema for dimension {n_dimension} on {tenant}"
+        ) from None
@@ -0,0 +1,192 @@
+"""Build one freezer from several worker processes, one subtree range per process.
+
+The top level under the parent (shelves, or racks/canes for LN2) is split into
+contiguous ordinal ranges. The parent location is created first. Every worker then
+opens its own Benchling session with create_session and builds its range with
+pipeline.create_stream, writing its own csv part and journal. The csv parts are
+concatenated in range order, which is the depth-first order of a single-process run,
+and the workers' key -> storage id maps are merged into one. Each worker's calls are
+recorded in its own process and merged into the run's metrics.
+"""
+
+import csv
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from src import hierarchy
+from src import log
+from src import metrics
+from src import pipeline
+from src import settings
+from src import sinks
+from src import throttle
+from src.journal import Journal
+
+
+logger = log.logger()
+
+
+def split(storage: settings.StorageConfig, shards: int) -> List[range]:
+    "Contiguous, non-empty top-level ordinal ranges, as even in size as possible"
+
+    top = storage.shelves or storage.racks
+    shards = max(1, min(shards, top))
+    size, extra = divmod(top, shards)
+
+    ranges = []
+    start = 1
+    for number in range(shards):
+        stop = start + size + (1 if number < extra else 0)
+        ranges.append(range(start, stop))
+        start = stop
+    return ranges
+
+
+def part_path(path: str, number: int) -> str:
+    "e.g. inventory_locations.csv -> inventory_locations.part0.csv"
+    root, extension = os.path.splitext(path)
+    return f"{root}.part{number}{extension}"
+
+
+def build_shard(
+    storage: settings.StorageConfig,
+    parameters: Any,
+    auth: Any,
+    box_schema: str,
+    parent_storage_id: str,
+    top: range,
+    csv_path: str,
+    journal_path: Optional[str],
+    completed: Dict[str, str],
+    resume: bool,
+    max_workers: int,
+    cache_path: Optional[str] = None,
+) -> Tuple[Counter, Dict[str, str], metrics.RunMetrics]:
+    """Build the subtrees of one top-level range, in a worker process. With cache_path,
+    the worker shares the run's credential cache and its 401 handling.
+
+    returns:
+        Number of completed nodes per level, the key -> storage id map of the range and
+        the metrics of its calls
+    """
+
+    # Imported here, inventory_builder imports shard for its CLI
+    from src import credentials
+    from src import inventory_builder
+
+    logger.info(f"initiated for {storage.parent_barcode} {top.start}-{top.stop - 1}")
+
+    # A reused worker process would otherwise report its earlier shards again
+    run_metrics = metrics.reset() if multiprocessing.parent_process() else metrics.current()
+    throttle.configure(max_concurrency=max_workers)
+    benchling_client = inventory_builder.create_session(
+        tenant=parameters.tenant,
+        auth=auth,
+        cache=credentials.CredentialCache(cache_path) if cache_path else None,
+        secret_name=parameters.secret,
+    )
+
+    # The run's own journal already guards an earlier run, the parts follow it
+    with Journal(journal_path, resume=resume, overwrite=True) as journal, sinks.CsvSink(
+        csv_path, compress=False
+    ) as sink:
+        journal.preload(completed)
+        counts = pipeline.create_stream(
+            nodes=sink.tee(hierarchy.iter_nodes(storage, top=top)),
+            parent_barcode=storage.parent_barcode,
+            parent_storage_id=parent_storage_id,
+            benchling_client=benchling_client,
+            schemas=inventory_builder.schemas_by_level(parameters, box_schema),
+            max_workers=max_workers,
+            journal=journal,
+        )
+        return counts, dict(journal.completed), run_metrics
+
+
+def merge_csv(parts: List[str], output_path: str) -> None:
+    "Concatenate the csv parts in order under a single header, then remove them"
+
+    with sinks.CsvSink(output_path) as sink:
+        for part in parts:
+            with open(part, newline="") as f:
+                rows = csv.reader(f)
+                next(rows, None)  # Header
+                for row in rows:
+                    sink.write_row(row)
+
+    for part in parts:
+        os.remove(part)
+
+
+def build_sharded(
+    storage: settings.StorageConfig,
+    parameters: Any,
+    auth: Any,
+    box_schema: str,
+    parent_storage_id: str,
+    shards: int,
+    journal: Optional[Journal] = None,
+    output_path: str = "inventory_locations.csv",
+    executor: Optional[Executor] = None,
+    cache_path: Optional[str] = None,
+) -> Tuple[Counter, Dict[str, str]]:
+    """Build everything below an already created parent location from shards worker
+    processes. The tenant's max_workers budget is divided between the workers. Each
+    worker keeps its own journal next to the run's, resumed along with it, so a resumed
+    run has to use the same number of shards.
+
+    returns:
+        Number of completed nodes per level, and the merged key -> storage id map
+    """
+    logger.info("initiated")
+
+    ranges = split(storage, shards)
+    max_workers = max(1, parameters.max_workers // len(ranges))
+    journal_path = journal.path if journal is not None else None
+    resume = journal is not None and journal.resume
+    known = dict(journal.completed) if journal is not None else {}
+    parts = [part_path(output_path, number) for number in range(len(ranges))]
+
+    # Spawned workers, a forked child would inherit the parent's threads and locks
+    executor = executor or ProcessPoolExecutor(
+        max_workers=len(ranges), mp_context=multiprocessing.get_context("spawn")
+    )
+    with executor:
+        futures = [
+            executor.submit(
+                build_shard,
+                storage,
+                parameters,
+                auth,
+                box_schema,
+                parent_storage_id,
+                top,
+                part,
+                part_path(journal_path, number) if journal_path else None,
+                known,
+                resume,
+                max_workers,
+                cache_path,
+            )
+            for number, (top, part) in enumerate(zip(ranges, parts))
+        ]
+        results = [future.result() for future in futures]
+
+    completed: Counter = Counter()
+    storage_ids = {storage.parent_barcode: parent_storage_id}
+    for counts, ids, _ in results:
+        completed.update(counts)
+        storage_ids.update(ids)
+    # Workers sharing this process (a thread executor) recorded into its metrics already
+    metrics.current().merge(*[e for _, _, e in results if e is not metrics.current()])
+
+    if journal is not None:
+        for key, storage_id in storage_ids.items():
+            if journal.get(key) is None:
+                journal.record(key, storage_id)
+
+    merge_csv(parts, output_path)
+    return completed, storage_ids
@@ -0,0 +1,75 @@
+"""Long-lived, buffered csv output for the storage hierarchy.
+
+A single CsvSink owns inventory_locations.csv (or a .csv.gz) for the whole run. It
+writes the header once, takes rows incrementally from the node stream and flushes
+every flush_every rows or whenever flush() is called.
+"""
+
+import csv
+import gzip
+import io
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+from src import models
+
+
+CSV_HEADER = ["Location Barcode", "Barcode", "Name"]
+
+
+class CsvSink:
+    def __init__(
+        self,
+        path: str = "inventory_locations.csv",
+        compress: Optional[bool] = None,
+        flush_every: int = 10_000,
+        buffer_size: int = 1 << 20,
+    ):
+        """compress defaults to True for paths ending in .gz. buffer_size applies to
+        plain csv, gzip buffers its own compressed output."""
+        self.path = path
+        self.compress = path.endswith(".gz") if compress is None else compress
+        self.flush_every = flush_every
+        self.rows = 0
+
+        self._gzip = None
+        if self.compress:
+            self._gzip = gzip.open(path, "wb")
+            self._file = io.TextIOWrapper(self._gzip, newline="")
+        else:
+            self._file = open(path, "w", newline="", buffering=buffer_size)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_HEADER)
+
+    def write_row(self, row: List[str]) -> None:
+        self._writer.writerow(row)
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.flush()
+
+    def write(self, node: models.Node) -> None:
+        "Box rows leave the Barcode empty, Benchling autogenerates box barcodes"
+        self.write_row([node.parent_barcode, node.barcode or "", node.name])
+
+    def tee(self, nodes: Iterable[models.Node]) -> Iterator[models.Node]:
+        "Write each node as it passes through to the next consumer of the stream"
+        for node in nodes:
+            self.write(node)
+            yield node
+
+    def flush(self) -> None:
+        self._file.flush()
+        if self._gzip is not None:
+            # Without a sync flush the rows stay in the compressor, and a reader of the
+            # .gz sees nothing until close
+            self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> "CsvSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,256 @@
+"""In-process stand-in for the Benchling locations and boxes endpoints.
+
+FakeBenchling has the client surface the pipelines use (create, list and archive
+for locations and boxes) and keeps the created storage in memory. Latency, server
+errors and 429 throttling are simulated, with errors raised as BenchlingError just
+like the SDK does, so main() can run as a dry run and the concurrency and retry
+behavior can be load tested without network access.
+"""
+
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class StoredObject:
+    "A created location or box, with the attributes the SDK models have"
+
+    __slots__ = ("id", "barcode", "name", "schema_id", "parent_storage_id", "archived")
+
+    def __init__(self, id, barcode, name, schema_id, parent_storage_id):
+        self.id = id
+        self.barcode = barcode
+        self.name = name
+        self.schema_id = schema_id
+        self.parent_storage_id = parent_storage_id
+        self.archived = False
+
+
+def body(model: Any) -> Dict[str, Any]:
+    "JSON body of an SDK request model, the fields left unset are omitted"
+    return model.to_dict()
+
+
+class Pages:
+    "Iterable of result pages with first(), like the SDK's PageIterator"
+
+    def __init__(self, results: List[StoredObject], page_size: int):
+        self._results = results
+        self._page_size = page_size
+
+    def __iter__(self) -> Iterator[List[StoredObject]]:
+        for start in range(0, len(self._results), self._page_size):
+            yield self._results[start : start + self._page_size]
+
+    def first(self) -> Optional[StoredObject]:
+        return self._results[0] if self._results else None
+
+
+class FakeBenchling:
+    """Benchling client stand-in.
+
+    latency is the mean seconds per call, give or take jitter times it (0 for a fixed
+    latency). error_rate and throttle_rate are the chances of a 500 and of a 429 per
+    call, and rate_limit answers 429 with Retry-After beyond that many calls per second
+    (token bucket).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.5,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        rate_limit: Optional[float] = None,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+
+        self.calls: Counter = Counter()  # Per endpoint, including failed calls
+        self.errors: Counter = Counter()  # Per status code
+        self.objects: Dict[str, StoredObject] = {}
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._tokens = rate_limit or 0.0
+        self._refilled = time.monotonic()
+
+        self._by_barcode: Dict[str, str] = {}
+
+        self.locations = LocationService(self)
+        self.boxes = BoxService(self)
+
+    def _fail(
+        self,
+        status_code: int,
+        retry_after: Optional[float] = None,
+        message: Optional[str] = None,
+    ) -> None:
+        from benchling_sdk.errors import BenchlingError
+
+        self.errors[status_code] += 1
+        headers = {} if retry_after is None else {"Retry-After": f"{retry_after:.3f}"}
+        raise BenchlingError(
+            status_code=status_code,
+            headers=headers,
+            json={"error": {"message": message or f"Simulated {status_code}"}},
+            content=None,
+            parsed=None,
+        )
+
+    def request(self, endpoint: str) -> None:
+        "Account for one call, sleep for its latency or raise its simulated error"
+
+        with self._lock:
+            self.calls[endpoint] += 1
+
+            if self.rate_limit is not None:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit
+                )
+                self._refilled = now
+                if self._tokens < 1:
+                    self._fail(429, (1 - self._tokens) / self.rate_limit)
+                self._tokens -= 1
+
+            draw = self._random.random()
+            jitter = self._random.uniform(1 - self.jitter, 1 + self.jitter)
+
+        if draw < self.throttle_rate:
+            self._fail(429, self.retry_after)
+        if draw < self.throttle_rate + self.error_rate:
+            time.sleep(self.latency * jitter)
+            self._fail(500)
+        time.sleep(self.latency * jitter)
+
+    def store(
+        self,
+        prefix: str,
+        barcode: Optional[str],
+        name: str,
+        schema_id: str,
+        parent_id: Optional[str],
+    ) -> StoredObject:
+        with self._lock:
+            if parent_id is not None and parent_id not in self.objects:
+                self._fail(400)
+            if barcode is not None and barcode in self._by_barcode:
+                self._fail(409)  # Barcodes are unique within the tenant
+            stored = StoredObject(
+                f"{prefix}_{next(self._ids):08d}", barcode, name, schema_id, parent_id
+            )
+            self.objects[stored.id] = stored
+            if barcode is not None:
+                self._by_barcode[barcode] = stored.id
+            return stored
+
+    def archive(self, ids: List[str], should_remove_barcodes: bool) -> None:
+        with self._lock:
+            # Nothing of the call is archived when one of its ids already is
+            for storage_id in ids:
+                if self.objects[storage_id].archived:
+                    self._fail(400, message=f"{storage_id} is already archived")
+            for storage_id in ids:
+                stored = self.objects[storage_id]
+                stored.archived = True
+                if should_remove_barcodes and stored.barcode is not None:
+                    self._by_barcode.pop(stored.barcode, None)
+                    stored.barcode = None
+
+    def list(
+        self,
+        prefix: str,
+        barcodes: Optional[List[str]],
+        ancestor_storage_id: Optional[str],
+    ) -> List[StoredObject]:
+        with self._lock:
+            return [
+                e
+                for e in self.objects.values()
+                if e.id.startswith(f"{prefix}_")
+                and not e.archived
+                and (barcodes is None or e.barcode in barcodes)
+                and (
+                    ancestor_storage_id is None
+                    or ancestor_storage_id in self._ancestors(e)
+                )
+            ]
+
+    def _ancestors(self, stored: StoredObject) -> Iterator[str]:
+        parent_id = stored.parent_storage_id
+        while parent_id is not None:
+            yield parent_id
+            parent_id = self.objects[parent_id].parent_storage_id
+
+
+class LocationService:
+    "locations endpoints"
+
+    def __init__(self, tenant: FakeBenchling):
+        self._tenant = tenant
+
+    def create(self, location: Any) -> StoredObject:
+        self._tenant.request("locations.create")
+        fields = body(location)
+        return self._tenant.store(
+            "loc",
+            fields.get("barcode"),
+            fields["name"],
+            fields["schemaId"],
+            fields.get("parentStorageId"),
+        )
+
+    def list(
+        self,
+        barcodes: Optional[List[str]] = None,
+        ancestor_storage_id: Optional[str] = None,
+        page_size: int = 50,
+        **kwargs,
+    ) -> Pages:
+        self._tenant.request("locations.list")
+        return Pages(self._tenant.list("loc", barcodes, ancestor_storage_id), page_size)
+
+    def archive(
+        self, location_ids: List[str], reason: Any, should_remove_barcodes: bool
+    ) -> None:
+        self._tenant.request("locations.archive")
+        self._tenant.archive(location_ids, should_remove_barcodes)
+
+
+class BoxService:
+    "boxes endpoints, box barcodes are left to Benchling to generate"
+
+    def __init__(self, tenant: FakeBenchling):
+        self._tenant = tenant
+
+    def create(self, box: Any) -> StoredObject:
+        self._tenant.request("boxes.create")
+        fields = body(box)
+        return self._tenant.store(
+            "box", None, fields["name"], fields["schemaId"], fields.get("parentStorageId")
+        )
+
+    def list(
+        self,
+        barcodes: Optional[List[str]] = None,
+        ancestor_storage_id: Optional[str] = None,
+        page_size: int = 50,
+        **kwargs,
+    ) -> Pages:
+        self._tenant.request("boxes.list")
+        return Pages(self._tenant.list("box", barcodes, ancestor_storage_id), page_size)
+
+    def archive(self, box_ids: List[str], reason: Any, should_remove_barcodes: bool) -> None:
+        self._tenant.request("boxes.archive")
+        self._tenant.archive(box_ids, should_remove_barcodes)
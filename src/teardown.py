@@ -0,0 +1,257 @@
+"""Archive a freezer: the parent location and everything below it.
+
+For a build that failed midway or a decommissioned freezer. The subtree is listed with
+the same paginated calls as reconcile.fetch_existing and archived from the leaves up,
+so nothing is archived before its contents: every box first, then the locations one
+depth at a time (drawers/rows, racks/canes, shelves) and the parent last. Within a
+depth the ids are archived in batches, in parallel through the shared throttle.
+
+    python -m src.teardown --parent_barcode EQS-1234 --instance dev
+"""
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import click
+
+from src import log
+from src import metrics
+from src import reconcile
+from src import settings
+from src import throttle
+
+
+logger = log.logger()
+
+BATCH_SIZE = 100
+REASONS = ["Made in error", "Retired", "Other"]  # Valid for locations and boxes
+
+
+class Wave(NamedTuple):
+    "Ids archived together, after every earlier wave completed"
+
+    level: str
+    endpoint: str
+    ids: List[str]
+
+
+def plan(benchling_client: Any, parent_barcode: str) -> List[Wave]:
+    """List the unarchived subtree of parent_barcode.
+
+    returns:
+        Boxes, then the locations deepest first, then the parent, empty when the parent
+        does not exist
+    """
+    logger.info("initiated")
+
+    parent = benchling_client.locations.list(barcodes=[parent_barcode]).first()
+    if parent is None:
+        return []
+
+    parent_ids = {}
+    for location in reconcile.flatten(
+        benchling_client.locations.list(
+            ancestor_storage_id=parent.id, page_size=reconcile.PAGE_SIZE
+        )
+    ):
+        parent_ids[location.id] = location.parent_storage_id
+
+    depths = {parent.id: 0}
+
+    def depth(storage_id: str) -> int:
+        # Parents may be listed after their children
+        if storage_id not in depths:
+            depths[storage_id] = depth(parent_ids[storage_id]) + 1
+        return depths[storage_id]
+
+    by_depth: Dict[int, List[str]] = defaultdict(list)
+    for storage_id in parent_ids:
+        by_depth[depth(storage_id)].append(storage_id)
+
+    boxes = [
+        box.id
+        for box in reconcile.flatten(
+            benchling_client.boxes.list(
+                ancestor_storage_id=parent.id, page_size=reconcile.PAGE_SIZE
+            )
+        )
+    ]
+
+    waves = [Wave("box", "boxes.archive", boxes)] if boxes else []
+    for level in sorted(by_depth, reverse=True):
+        waves.append(Wave(f"depth {level}", "locations.archive", by_depth[level]))
+    waves.append(Wave("parent", "locations.archive", [parent.id]))
+    return waves
+
+
+def already_archived(error: Any) -> bool:
+    "Benchling rejects archiving an archived location or box with a 400"
+
+    message = ((error.json or {}).get("error") or {}).get("message") or ""
+    return error.status_code == 400 and "already archived" in message.lower()
+
+
+def archive_batch(
+    benchling_client: Any, wave: Wave, ids: List[str], reason: str, remove_barcodes: bool
+) -> int:
+    """Archive one batch of a wave. A retried attempt that finds the batch archived
+    succeeds, an earlier attempt committed it before its response was lost.
+    """
+
+    from benchling_sdk.errors import BenchlingError
+    from benchling_sdk.models import BoxesArchiveReason, LocationsArchiveReason
+
+    attempts = []
+
+    def archive(service_archive, **kwargs) -> None:
+        retried = bool(attempts)
+        attempts.append(True)
+        try:
+            service_archive(**kwargs)
+        except BenchlingError as error:
+            if not (retried and already_archived(error)):
+                raise
+
+    if wave.endpoint == "boxes.archive":
+        throttle.call(
+            archive,
+            benchling_client.boxes.archive,
+            box_ids=ids,
+            reason=BoxesArchiveReason(reason),
+            should_remove_barcodes=remove_barcodes,
+            endpoint=wave.endpoint,
+            level=wave.level,
+        )
+    else:
+        throttle.call(
+            archive,
+            benchling_client.locations.archive,
+            location_ids=ids,
+            reason=LocationsArchiveReason(reason),
+            should_remove_barcodes=remove_barcodes,
+            endpoint=wave.endpoint,
+            level=wave.level,
+        )
+    return len(ids)
+
+
+def teardown(
+    benchling_client: Any,
+    waves: List[Wave],
+    max_workers: int,
+    batch_size: int = BATCH_SIZE,
+    reason: str = "Made in error",
+    remove_barcodes: bool = True,
+) -> int:
+    """Archive the waves in order, each one's batches in parallel. Removing the
+    barcodes frees them for a rebuild under the same asset tag.
+
+    returns:
+        Number of archived locations and boxes
+    """
+    logger.info("initiated")
+
+    archived = 0
+    with ThreadPoolExecutor(
+        max_workers=max_workers, initializer=log.adopt, initargs=(log.current(),)
+    ) as pool:
+        for wave in waves:
+            batches = [
+                wave.ids[start : start + batch_size]
+                for start in range(0, len(wave.ids), batch_size)
+            ]
+            # sum() waits for the whole wave and raises its first failure
+            archived += sum(
+                pool.map(
+                    lambda ids: archive_batch(
+                        benchling_client, wave, ids, reason, remove_barcodes
+                    ),
+                    batches,
+                )
+            )
+            logger.info(
+                f"{len(wave.ids)} archived", extra={"fields": {"storage_level": wave.level}}
+            )
+    return archived
+
+
+@click.command()
+@click.option("--parent_barcode", required=True, help="Asset tag of the freezer.")
+@click.option(
+    "--instance",
+    type=click.Choice(["dev", "test", "prod"], case_sensitive=False),
+    default=None,
+    help="Tenant instance, prompted for when omitted.",
+)
+@click.option(
+    "--batch_size",
+    type=click.IntRange(min=1),
+    default=BATCH_SIZE,
+    show_default=True,
+    help="Ids per archive call.",
+)
+@click.option(
+    "--reason",
+    type=click.Choice(REASONS),
+    default="Made in error",
+    show_default=True,
+)
+@click.option(
+    "--keep_barcodes",
+    is_flag=True,
+    default=False,
+    help="Keep the archived barcodes, they cannot be reused by a rebuild then.",
+)
+@click.option("--yes", is_flag=True, default=False, help="Skip the confirmation.")
+@click.option("--no_credential_cache", is_flag=True, default=False)
+def cli(
+    parent_barcode: str,
+    instance: Optional[str],
+    batch_size: int,
+    reason: str,
+    keep_barcodes: bool,
+    yes: bool,
+    no_credential_cache: bool,
+):
+    # Imported here, inventory_builder is slow to import and has the session setup
+    from src import credentials
+    from src import inventory_builder
+
+    parameters = settings.env_variables(instance)
+    log.bind(tenant=parameters.tenant, parent_barcode=parent_barcode)
+    metrics.reset()
+
+    cache = None if no_credential_cache else credentials.CredentialCache()
+    secret = credentials.get_secret(parameters.secret, cache)
+    throttle.configure(max_concurrency=parameters.max_workers)
+    benchling_client = inventory_builder.create_session(
+        tenant=parameters.tenant, auth=secret, cache=cache, secret_name=parameters.secret
+    )
+
+    waves = plan(benchling_client, parent_barcode)
+    if not waves:
+        raise click.ClickException(f"{parent_barcode} does not exist or is archived")
+
+    total = sum(len(wave.ids) for wave in waves)
+    boxes = sum(len(wave.ids) for wave in waves if wave.level == "box")
+    print(f"{parent_barcode} on {parameters.tenant}: {boxes} boxes, {total - boxes} locations")
+    if not yes:
+        click.confirm(f"Archive all {total} as '{reason}'?", abort=True)
+
+    archived = teardown(
+        benchling_client,
+        waves,
+        max_workers=parameters.max_workers,
+        batch_size=batch_size,
+        reason=reason,
+        remove_barcodes=not keep_barcodes,
+    )
+    print(
+        f"{archived} archived. Rebuild with --overwrite_journal, the storage ids in "
+        f"{parent_barcode}.journal.jsonl are archived now."
+    )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,204 @@
+"""Shared request-execution layer for every Benchling create call.
+
+Retries rate limited (429) and server side (5xx) failures as well as transport errors,
+honoring Retry-After when the API sends it and otherwise backing off exponentially
+with full jitter. A call rejected as unauthorized (401) is retried once, right after
+the session's cached credentials are dropped, see on_unauthorized. The number of
+calls allowed in flight adapts on its own: it grows by one after a window of
+successes and is halved whenever the tenant throttles us.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional, TypeVar
+
+from src import log
+from src import metrics
+
+
+logger = log.logger()
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+THROTTLE_STATUS_CODES = {429, 503}
+UNAUTHORIZED = 401
+
+_reauthenticate: Optional[Callable[[], None]] = None
+
+
+def retry_after(headers: Any) -> Optional[float]:
+    "Seconds to wait according to a Retry-After header, either delta-seconds or a date"
+
+    value = (headers or {}).get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveThrottle:
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 60.0,
+    ):
+        if not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError(
+                f"Concurrency must satisfy 1 <= min <= max, got: {min_concurrency}, {max_concurrency}"
+            )
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        # Start in the middle so there is room to grow before the tenant pushes back
+        self.limit = max(min_concurrency, max_concurrency // 2)
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            metrics.current().set_in_flight(self.in_flight, self.limit)
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+            metrics.current().set_in_flight(self.in_flight, self.limit)
+
+    def on_success(self) -> None:
+        "Additive increase, one extra slot after `limit` consecutive successes"
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def on_throttle(self) -> None:
+        "Multiplicative decrease when the tenant signals it is overloaded"
+        with self._condition:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+            self._successes = 0
+        metrics.current().throttle_event(self.limit)
+        logger.warning(f"throttled, concurrency limit reduced to {self.limit}")
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        "Seconds to sleep before retrying, None when the error is not retryable"
+
+        # Only needed once a call failed, importing them here keeps startup light
+        import httpx
+        from benchling_sdk.errors import BenchlingError
+
+        if isinstance(error, httpx.TransportError):
+            return self.backoff(attempt)
+
+        if (
+            isinstance(error, BenchlingError)
+            and error.status_code in RETRYABLE_STATUS_CODES
+        ):
+            if error.status_code in THROTTLE_STATUS_CODES:
+                self.on_throttle()
+            delay = retry_after(error.headers)
+            return min(self.max_delay, delay) if delay is not None else self.backoff(attempt)
+
+        return None
+
+    def call(
+        self,
+        fn: Callable[..., T],
+        *args,
+        endpoint: str = "other",
+        level: str = "other",
+        **kwargs,
+    ) -> T:
+        """Run fn within the concurrency limit, retrying retryable failures. endpoint and
+        level label the attempts in the run metrics, e.g. "boxes.create" and "box".
+        """
+
+        reauthenticated = False
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as error:
+                outcome = str(getattr(error, "status_code", type(error).__name__))
+                metrics.current().observe(
+                    endpoint, level, time.perf_counter() - started, outcome
+                )
+                delay = self.retry_delay(error, attempt)
+                reauthenticate = _reauthenticate
+                if (
+                    delay is None
+                    and not reauthenticated
+                    and reauthenticate is not None
+                    and getattr(error, "status_code", None) == UNAUTHORIZED
+                ):
+                    # A revoked token or rotated secret, the session vends a new token
+                    reauthenticated = True
+                    reauthenticate()
+                    delay = 0.0
+                if delay is None or attempt == self.max_retries:
+                    raise
+                metrics.current().retried(endpoint, outcome)
+                logger.warning(
+                    f"attempt {attempt + 1} failed with {error}, retrying in {delay:.2f}s"
+                )
+            else:
+                metrics.current().observe(endpoint, level, time.perf_counter() - started, "ok")
+                self.on_success()
+                return result
+            finally:
+                self.release()
+
+            # Sleep outside the limit so other calls can use the slot meanwhile
+            time.sleep(delay)
+
+
+_throttle = AdaptiveThrottle()
+
+
+def configure(**kwargs) -> AdaptiveThrottle:
+    "Replace the shared throttle, e.g. configure(max_concurrency=parameters.max_workers)"
+    global _throttle
+    _throttle = AdaptiveThrottle(**kwargs)
+    return _throttle
+
+
+def current() -> AdaptiveThrottle:
+    return _throttle
+
+
+def on_unauthorized(callback: Optional[Callable[[], None]]) -> None:
+    """callback drops the rejected credentials before a 401 is retried once, e.g. the
+    session's CachedClientCredentialsOAuth2.invalidate. Kept when the throttle is
+    replaced by configure.
+    """
+    global _reauthenticate
+    _reauthenticate = callback
+
+
+def call(fn: Callable[..., T], *args, **kwargs) -> T:
+    "Run fn through the shared throttle, see AdaptiveThrottle.call"
+    return _throttle.call(fn, *args, **kwargs)
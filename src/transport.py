@@ -0,0 +1,110 @@
+"""One pooled HTTP client shared by every Benchling session of a process.
+
+The SDK otherwise builds its own httpx client per Benchling instance, with httpx's
+default pool. The shared client keeps up to the run's concurrency of connections
+alive between calls, so the worker threads reuse open TLS connections instead of
+handshaking again. Every request is counted as a pool hit (sent on a kept-alive
+connection) or a miss (a new connection was opened), in stats() and in the run
+metrics, to tune the pool size and keep-alive expiry.
+"""
+
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from src import log
+from src import metrics
+
+
+logger = log.logger()
+
+KEEPALIVE_EXPIRY = 60.0  # Seconds an idle connection is kept open
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+_lock = threading.Lock()
+_client: Optional[httpx.Client] = None
+_transport: Optional["CountingTransport"] = None
+_size = 0
+
+
+class CountingTransport(httpx.HTTPTransport):
+    "HTTPTransport that counts the requests sent on reused and on new connections"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        opened = []
+        outer = request.extensions.get("trace")
+
+        def trace(event: str, info: Dict) -> None:
+            if event == "connection.connect_tcp.started":
+                opened.append(True)
+            if outer is not None:
+                outer(event, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        response = super().handle_request(request)
+
+        reused = not opened
+        with self._lock:
+            if reused:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.current().connection(reused)
+        return response
+
+
+def create_transport(max_connections: int) -> CountingTransport:
+    "Pool of up to max_connections connections, all of them kept alive when idle"
+    return CountingTransport(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+    )
+
+
+def shared_client(max_connections: int) -> httpx.Client:
+    """The process's client, created on first use with a pool of max_connections.
+
+    The pool is sized once per process. Replacing the client for a later, larger
+    request would either leak the old pool or close it under the sessions using it.
+    """
+    global _client, _transport, _size
+
+    with _lock:
+        if _client is None:
+            _transport = create_transport(max_connections)
+            _client = httpx.Client(transport=_transport, timeout=TIMEOUT)
+            _size = max_connections
+            logger.info(f"connection pool of {max_connections}")
+        elif max_connections > _size:
+            logger.warning(
+                f"connection pool of {_size} kept, {max_connections} were asked for"
+            )
+        return _client
+
+
+def stats() -> Dict[str, int]:
+    "Pool hits and misses of the shared client"
+
+    with _lock:
+        if _transport is None:
+            return {"hits": 0, "misses": 0}
+        return {"hits": _transport.hits, "misses": _transport.misses}
+
+
+def close() -> None:
+    global _client, _transport, _size
+
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client, _transport, _size = None, None, 0
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src import async_pipeline
+from src import hierarchy
+from tests.test_pipeline import SCHEMAS, STORAGE, created_ids, fake_client
+
+
+@pytest.mark.unittest
+def test_create_stream_matches_threaded_pipeline():
+    client = fake_client()
+
+    actual = asyncio.run(
+        async_pipeline.create_stream(
+            nodes=hierarchy.iter_nodes(STORAGE),
+            parent_barcode="EQS-1234",
+            parent_storage_id="freezer_id",
+            benchling_client=client,
+            schemas=SCHEMAS,
+            concurrency=3,
+        )
+    )
+
+    assert actual == {"shelf": 2, "rack": 4, "box": 4}
+    assert "id_EQS-1234-S2-R2/Box 1" in created_ids(client)
+
+
+@pytest.mark.unittest
+def test_create_stream_bounds_in_flight_creates():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+    client = fake_client()
+    create = client.locations.create.side_effect
+
+    def tracked(location):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return create(location=location)
+
+    client.locations.create.side_effect = tracked
+
+    asyncio.run(
+        async_pipeline.create_stream(
+            nodes=hierarchy.iter_nodes(STORAGE),
+            parent_barcode="EQS-1234",
+            parent_storage_id="freezer_id",
+            benchling_client=client,
+            schemas=SCHEMAS,
+            concurrency=2,
+        )
+    )
+    assert peak <= 2
@@ -0,0 +1,185 @@
+import json
+
+import click
+import pytest
+
+from src import batch
+from src import settings
+from tests.test_pipeline import fake_client
+
+
+FREEZERS = [
+    {
+        "parent_barcode": "EQS-1234",
+        "parent_name": "Floor A - Blue Freezer",
+        "shelves": 2,
+        "rack_prefix": "R",
+        "rack_in_full": "Rack",
+        "racks": 2,
+        "drawer_prefix": "D",
+        "drawer_in_full": "Drawer",
+        "drawers": 1,
+        "boxes": 2,
+        "box_dimension": 1,
+    },
+    {
+        "parent_barcode": "EQS-5678",
+        "parent_name": "Floor A - LN2",
+        "shelves": 0,
+        "rack_prefix": "C",
+        "rack_in_full": "Cane",
+        "racks": 3,
+        "drawer_prefix": None,
+        "drawer_in_full": None,
+        "drawers": 0,
+        "boxes": 1,
+        "box_dimension": 2,
+    },
+]
+
+
+@pytest.mark.unittest
+def test_load_manifest_json(tmp_path):
+    path = tmp_path / "freezers.json"
+    path.write_text(json.dumps({"freezers": FREEZERS}))
+
+    actual = batch.load_manifest(str(path))
+
+    assert [e.parent_barcode for e in actual] == ["EQS-1234", "EQS-5678"]
+
+
+@pytest.mark.unittest
+def test_load_manifest_without_drawer_fields(tmp_path):
+    path = tmp_path / "freezers.json"
+    ln2 = {
+        key: value for key, value in FREEZERS[1].items() if not key.startswith("drawer_")
+    }
+    path.write_text(json.dumps([ln2]))
+
+    assert batch.load_manifest(str(path))[0].drawer_prefix is None
+
+
+@pytest.mark.unittest
+def test_load_manifest_yaml(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    path = tmp_path / "freezers.yaml"
+    path.write_text(yaml.safe_dump(FREEZERS))
+
+    assert batch.load_manifest(str(path))[1].rack_in_full == "Cane"
+
+
+@pytest.mark.unittest
+def test_load_manifest_csv(tmp_path):
+    path = tmp_path / "freezers.csv"
+    header = list(FREEZERS[0])
+    rows = [",".join(header)] + [
+        ",".join("" if e[key] is None else str(e[key]) for key in header)
+        for e in FREEZERS
+    ]
+    path.write_text("\n".join(rows) + "\n")
+
+    actual = batch.load_manifest(str(path))
+
+    assert actual[1].drawer_prefix is None
+    assert actual[0].boxes == 2
+
+
+@pytest.mark.unittest
+def test_load_manifest_reports_every_invalid_entry(tmp_path):
+    path = tmp_path / "freezers.json"
+    path.write_text(
+        json.dumps(
+            [
+                {**FREEZERS[0], "racks": -1},
+                FREEZERS[1],
+                {**FREEZERS[1], "rack_prefix": "X"},
+                FREEZERS[1],
+            ]
+        )
+    )
+
+    with pytest.raises(ValueError) as e:
+        batch.load_manifest(str(path))
+
+    message = str(e.value)
+    assert "entry 1" in message
+    assert "entry 3" in message
+    assert "duplicate parent_barcode: EQS-5678" in message
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize(
+    "update, error",
+    [
+        (dict(drawer_prefix=None, drawer_in_full=None), "drawers need drawer_prefix"),
+        (dict(drawer_in_full=None), "must be given together"),
+        (dict(drawer_prefix="R"), "does not match drawer_in_full"),
+        (dict(rack_in_full="Cane"), "does not match rack_in_full"),
+        (dict(box_dimension=7), "box_dimension must be 1"),
+    ],
+)
+def test_storage_config_rejects_inconsistent_fields(update, error):
+    with pytest.raises(ValueError, match=error):
+        settings.StorageConfig(**{**FREEZERS[0], **update})
+
+
+@pytest.mark.unittest
+def test_build_all(tmp_path, capsys):
+    configs = [settings.StorageConfig(**e) for e in FREEZERS]
+
+    actual = batch.build_all(
+        configs,
+        settings.DevelopmentSettings(),
+        fake_client(),
+        parallel_freezers=2,
+        output_dir=str(tmp_path),
+    )
+
+    assert [e.objects for e in actual] == [1 + 2 + 4 + 4 + 8, 1 + 3 + 3]
+    assert (tmp_path / "EQS-5678_inventory_locations.csv").exists()
+    assert (tmp_path / "EQS-1234.journal.jsonl").exists()
+    assert "Overall: 26 objects across 2 freezers" in capsys.readouterr().out
+
+
+@pytest.mark.unittest
+def test_build_all_reports_failed_freezers(tmp_path, capsys):
+    configs = [settings.StorageConfig(**e) for e in FREEZERS]
+    client = fake_client()
+    create = client.locations.create.side_effect
+
+    def fail_ln2(location):
+        if location.barcode == "EQS-5678":
+            raise RuntimeError("boom")
+        return create(location=location)
+
+    client.locations.create.side_effect = fail_ln2
+
+    with pytest.raises(click.ClickException, match="1 of 2 freezers failed") as error:
+        batch.build_all(
+            configs, settings.DevelopmentSettings(), client, output_dir=str(tmp_path)
+        )
+    assert error.value.message.splitlines()[1] == "EQS-5678: boom"
+    assert "EQS-5678: 0 objects" in capsys.readouterr().out
+
+
+@pytest.mark.unittest
+def test_build_all_keeps_earlier_journals(tmp_path):
+    configs = [settings.StorageConfig(**e) for e in FREEZERS]
+    (tmp_path / "EQS-5678.journal.jsonl").write_text(
+        '{"key": "EQS-5678", "storage_id": "loc_1"}\n'
+    )
+
+    with pytest.raises(FileExistsError, match="EQS-5678.journal.jsonl"):
+        batch.build_all(
+            configs, settings.DevelopmentSettings(), fake_client(), output_dir=str(tmp_path)
+        )
+    assert not (tmp_path / "EQS-1234.journal.jsonl").exists()
+
+    batch.build_all(
+        configs,
+        settings.DevelopmentSettings(),
+        fake_client(),
+        output_dir=str(tmp_path),
+        overwrite_journal=True,
+    )
+    assert (tmp_path / "EQS-1234.journal.jsonl").exists()
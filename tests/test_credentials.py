@@ -0,0 +1,107 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from unittest.mock import MagicMock
+
+from benchling_sdk.auth.client_credentials_oauth2 import ClientCredentialsOAuth2, Token
+
+from src import credentials
+from src import secrets_manager
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    monkeypatch.delenv(credentials.KEY_VARIABLE, raising=False)
+    return str(tmp_path / "credentials.bin")
+
+
+@pytest.mark.unittest
+def test_cache_persists_encrypted_across_runs(cache_path):
+    loader = MagicMock(return_value=({"client_id": "abc"}, time.time() + 3600))
+
+    first = credentials.CredentialCache(cache_path).get("secret:dev", loader)
+    second = credentials.CredentialCache(cache_path).get("secret:dev", loader)
+
+    assert first == second == {"client_id": "abc"}
+    assert loader.call_count == 1
+    assert b"abc" not in open(cache_path, "rb").read()
+
+
+@pytest.mark.unittest
+def test_cache_reloads_expired_and_refreshes_ahead(cache_path):
+    cache = credentials.CredentialCache(cache_path, refresh_ahead=0.5)
+    cache.get("token", lambda: ("old", time.time() - 1))
+
+    # Expired, loaded synchronously
+    assert cache.get("token", lambda: ("new", time.time() + 1)) == "new"
+
+    # Within the last half of its lifetime, still served while it is refreshed
+    time.sleep(0.6)
+    assert cache.get("token", lambda: ("newer", time.time() + 100)) == "new"
+    deadline = time.time() + 5
+    while cache.get("token", MagicMock()) != "newer" and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get("token", MagicMock()) == "newer"
+
+
+@pytest.mark.unittest
+def test_get_secret_parses_json_string(cache_path, monkeypatch):
+    get_secret = MagicMock(return_value='{"client_id": "abc", "client_secret": "xyz"}')
+    monkeypatch.setattr(secrets_manager, "get_secret", get_secret)
+    cache = credentials.CredentialCache(cache_path)
+
+    for _ in range(3):
+        actual = credentials.get_secret("dev-secret", cache)
+
+    assert actual == {"client_id": "abc", "client_secret": "xyz"}
+    get_secret.assert_called_once_with(secret_name="dev-secret")
+
+
+@pytest.mark.unittest
+def test_cached_oauth_reuses_token_across_sessions(cache_path, monkeypatch):
+    vended = []
+
+    def vend_new_token(self, base_url):
+        vended.append(base_url)
+        self._token = Token("token_1", datetime.now(timezone.utc) + timedelta(hours=1))
+
+    monkeypatch.setattr(ClientCredentialsOAuth2, "vend_new_token", vend_new_token)
+    cache = credentials.CredentialCache(cache_path)
+
+    headers = [
+        credentials.CachedClientCredentialsOAuth2("id", "secret", cache)
+        .get_authorization_header("https://orgdev.benchling.com")
+        for _ in range(2)
+    ]
+
+    assert headers == ["Bearer token_1", "Bearer token_1"]
+    assert vended == ["https://orgdev.benchling.com"]
+
+
+@pytest.mark.unittest
+def test_cached_oauth_invalidate_reloads_token_and_secret(cache_path, monkeypatch):
+    vended = []
+
+    def vend_new_token(self, base_url):
+        vended.append(self._header_for_token_request["Authorization"])
+        self._token = Token(
+            f"token_{len(vended)}", datetime.now(timezone.utc) + timedelta(hours=1)
+        )
+
+    monkeypatch.setattr(ClientCredentialsOAuth2, "vend_new_token", vend_new_token)
+    get_secret = MagicMock(return_value='{"client_id": "id", "client_secret": "rotated"}')
+    monkeypatch.setattr(secrets_manager, "get_secret", get_secret)
+    cache = credentials.CredentialCache(cache_path)
+    cache.get("secret:dev-secret", lambda: ({"client_id": "id"}, time.time() + 3600))
+    auth = credentials.CachedClientCredentialsOAuth2(
+        "id", "secret", cache, secret_name="dev-secret"
+    )
+
+    assert auth.get_authorization_header("https://orgdev.benchling.com") == "Bearer token_1"
+    auth.invalidate()
+
+    assert auth.get_authorization_header("https://orgdev.benchling.com") == "Bearer token_2"
+    get_secret.assert_called_once_with(secret_name="dev-secret")
+    assert vended[0] != vended[1]
@@ -0,0 +1,85 @@
+import csv
+import json
+import os
+
+import pytest
+
+from src import export
+from src import hierarchy
+from src import inventory_builder
+from tests.test_pipeline import STORAGE
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+@pytest.mark.unittest
+def test_export_chunks_upload_order(tmp_path):
+    storage = STORAGE.model_copy(
+        update=dict(
+            shelves=2, racks=3, drawer_prefix="D", drawer_in_full="Drawer", drawers=2, boxes=2
+        )
+    )
+
+    manifest_path = export.export_chunks(
+        hierarchy.iter_nodes(storage), str(tmp_path), max_rows=5
+    )
+
+    with open(manifest_path) as f:
+        files = json.load(f)["upload_order"]
+    assert [(e["level"], e["rows"]) for e in files] == [
+        ("shelf", 2),
+        ("rack", 5),
+        ("rack", 1),
+        ("drawer", 5),
+        ("drawer", 5),
+        ("drawer", 2),
+    ] + [("box", 5)] * 4 + [("box", 4)]
+
+    # Every parent is uploaded in an earlier file than (or above) its children
+    uploaded = {storage.parent_barcode}
+    for e in files:
+        rows = read_rows(tmp_path / e["path"])
+        assert e["bytes"] == os.path.getsize(tmp_path / e["path"])
+        for row in rows[1:]:
+            assert row[0] in uploaded
+            if e["level"] != "box":
+                uploaded.add(row[1])
+
+
+@pytest.mark.unittest
+def test_export_chunks_matches_write_functions(tmp_path):
+    manifest_path = export.export_chunks(hierarchy.iter_nodes(STORAGE), str(tmp_path))
+    with open(manifest_path) as f:
+        files = {e["level"]: e["path"] for e in json.load(f)["upload_order"]}
+
+    shelf = inventory_builder.write_shelves(2, "EQS-1234")
+    rack = inventory_builder.write_racks_or_canes(
+        shelves=2,
+        rack_prefix="R",
+        rack_in_full="Rack",
+        racks=2,
+        parent_barcode="EQS-1234",
+        shelf_barcodes=shelf.barcodes,
+    )
+    box_names = inventory_builder.write_boxes(boxes=1, barcodes=rack.barcodes)
+
+    assert [row[1] for row in read_rows(tmp_path / files["shelf"])] == shelf.barcodes
+    assert sorted(row[1] for row in read_rows(tmp_path / files["rack"])[1:]) == sorted(
+        rack.barcodes[1:]
+    )
+    assert len(read_rows(tmp_path / files["box"])) == len(box_names)
+
+
+@pytest.mark.unittest
+def test_export_chunks_max_bytes(tmp_path):
+    manifest_path = export.export_chunks(
+        hierarchy.iter_nodes(STORAGE), str(tmp_path), max_bytes=80
+    )
+    with open(manifest_path) as f:
+        files = json.load(f)["upload_order"]
+
+    assert all(e["bytes"] <= 80 for e in files)
+    assert sum(e["rows"] for e in files) == 10
@@ -0,0 +1,107 @@
+import pytest
+
+from src import hierarchy
+from src import models
+from tests.test_pipeline import STORAGE
+
+
+DRAWERS = dict(drawer_prefix="D", drawer_in_full="Drawer", drawers=3, boxes=2)
+
+
+@pytest.mark.unittest
+def test_iter_nodes_depth_first():
+    actual = list(hierarchy.iter_nodes(STORAGE))
+    assert actual[:5] == [
+        models.Node("shelf", "EQS-1234", "EQS-1234-S1", "Shelf 1"),
+        models.Node("rack", "EQS-1234-S1", "EQS-1234-S1-R1", "Rack 1"),
+        models.Node("box", "EQS-1234-S1-R1", None, "Box 1"),
+        models.Node("rack", "EQS-1234-S1", "EQS-1234-S1-R2", "Rack 2"),
+        models.Node("box", "EQS-1234-S1-R2", None, "Box 1"),
+    ]
+    assert actual[2].key == "EQS-1234-S1-R1/Box 1"
+
+
+@pytest.mark.unittest
+def test_iter_nodes_ln2_with_rows():
+    storage = STORAGE.model_copy(
+        update=dict(
+            shelves=0,
+            rack_prefix="C",
+            rack_in_full="Cane",
+            racks=1,
+            drawer_prefix="R",
+            drawer_in_full="Row",
+            drawers=2,
+            boxes=1,
+        )
+    )
+    assert list(hierarchy.iter_nodes(storage)) == [
+        models.Node("rack", "EQS-1234", "EQS-1234-C1", "Cane 1"),
+        models.Node("drawer", "EQS-1234-C1", "EQS-1234-C1-R1", "Row 1"),
+        models.Node("box", "EQS-1234-C1-R1", None, "Box 1"),
+        models.Node("drawer", "EQS-1234-C1", "EQS-1234-C1-R2", "Row 2"),
+        models.Node("box", "EQS-1234-C1-R2", None, "Box 1"),
+    ]
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("shelves,drawers", [(0, 0), (3, 0), (0, 2), (3, 2)])
+def test_count_nodes(shelves, drawers):
+    storage = STORAGE.model_copy(
+        update=dict(
+            shelves=shelves,
+            drawers=drawers,
+            drawer_prefix="D" if drawers else None,
+            drawer_in_full="Drawer" if drawers else None,
+            racks=4,
+            boxes=5,
+        )
+    )
+    expected = {"shelf": 0, "rack": 0, "drawer": 0, "box": 0}
+    for node in hierarchy.iter_nodes(storage):
+        expected[node.level] += 1
+
+    assert hierarchy.count_nodes(storage) == expected
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize(
+    "update", [dict(DRAWERS, shelves=0), dict(DRAWERS, boxes=0), dict(racks=0)]
+)
+def test_template_skips_empty_levels(update):
+    storage = STORAGE.model_copy(update=update)
+    template = hierarchy.Template(storage)
+    nodes = list(hierarchy.iter_nodes(storage))
+    for level in ["shelf", "rack", "drawer", "box"]:
+        expected = [node for node in nodes if node.level == level]
+        expected.sort(key=lambda node: template.parse(node.key))
+        assert [template.node(level, i) for i in range(template.count(level))] == expected
+
+
+@pytest.mark.unittest
+def test_template_random_access_matches_iter_nodes():
+    storage = STORAGE.model_copy(update=DRAWERS)
+    template = hierarchy.Template(storage)
+    nodes = list(hierarchy.iter_nodes(storage))
+    for level in ["shelf", "rack", "drawer", "box"]:
+        expected = [node for node in nodes if node.level == level]
+        assert template.count(level) == len(expected)
+        # Level order, the order the write_* functions list nodes in
+        expected.sort(key=lambda node: template.parse(node.key))
+        assert [template.node(level, i) for i in range(len(expected))] == expected
+
+    assert template.coordinates("drawer", 7) == (2, 1, 2)
+    assert template.barcode("drawer", 7) == "EQS-1234-S2-R1-D2"
+    assert template.parent("drawer", 7) == ("rack", 2)
+    assert template.parent("shelf", 1) == ("parent", 0)
+    assert template.index(template.parse("EQS-1234-S2-R2-D3/Box 2")) == ("box", 23)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize(
+    "key", ["EQS-1234-S3", "EQS-1234-S1-R1-D4", "EQS-1234-S1/Box 1", "EQS-9999-S1"]
+)
+def test_template_parse_rejects_foreign_barcodes(key):
+    template = hierarchy.Template(STORAGE.model_copy(update=DRAWERS))
+    with pytest.raises(ValueError):
+        template.parse(key)
@@ -0,0 +1,49 @@
+import pytest
+
+from src import hierarchy
+from src import index
+from src import models
+from tests.test_pipeline import STORAGE
+
+
+def storage_ids():
+    ids = {STORAGE.parent_barcode: "loc_parent"}
+    ids.update({node.key: f"id_{node.key}" for node in hierarchy.iter_nodes(STORAGE)})
+    return ids
+
+
+@pytest.mark.unittest
+def test_write_and_read_index(tmp_path):
+    path = str(tmp_path / "EQS-1234.index.sqlite")
+
+    assert index.write_index(path, STORAGE, storage_ids()) == 1 + 2 + 4 + 4
+
+    with index.Index(path) as lookup:
+        assert len(lookup) == 11
+        assert lookup.get("EQS-1234-S2-R1/Box 1") == models.IndexEntry(
+            "EQS-1234-S2-R1/Box 1",
+            "id_EQS-1234-S2-R1/Box 1",
+            "EQS-1234-S2-R1",
+            "id_EQS-1234-S2-R1",
+            "box",
+            "Box 1",
+        )
+        assert lookup.parent_id("EQS-1234-S1") == "loc_parent"
+        assert lookup.by_storage_id("id_EQS-1234-S1-R2").key == "EQS-1234-S1-R2"
+        assert {e.key for e in lookup.children("EQS-1234-S1")} == {
+            "EQS-1234-S1-R1",
+            "EQS-1234-S1-R2",
+        }
+        assert lookup.storage_id("EQS-9999") is None
+
+
+@pytest.mark.unittest
+def test_write_index_skips_missing_ids_and_replaces_file(tmp_path):
+    path = str(tmp_path / "EQS-1234.index.sqlite")
+    index.write_index(path, STORAGE, storage_ids())
+
+    partial = {k: v for k, v in storage_ids().items() if "S2" not in k}
+    assert index.write_index(path, STORAGE, partial) == 1 + 1 + 2 + 2
+    with index.Index(path) as lookup:
+        assert lookup.get("EQS-1234-S2") is None
+    assert not (tmp_path / "EQS-1234.index.sqlite.tmp").exists()
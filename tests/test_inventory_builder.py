@@ -20,7 +20,7 @@ def test_write_shelves():
 
 @pytest.mark.unittest
 def test_write_racks_or_canes():
-    actual = inventory_builder.write_racks_or_canes(shelves=4, rack_prefix="R", rack_in_full="Rack", racks=5, parent_barcode="EQS-1234", shelf_barcodes=["Name", "Shelf 1", "Shelf 2", "Shelf 3", "Shelf 4"],mode="a")
+    actual = inventory_builder.write_racks_or_canes(shelves=4, rack_prefix="R", rack_in_full="Rack", racks=5, parent_barcode="EQS-1234", shelf_barcodes=["Name", "Shelf 1", "Shelf 2", "Shelf 3", "Shelf 4"])
     expected = models.Location(
         barcodes=[
             "Barcode",
@@ -263,3 +263,95 @@ def test_post_box(capsys):
     expected_output = "3 of 3 boxes successfully created"
     captured_output = capsys.readouterr()
     assert expected_output in captured_output.out
+
+
+@pytest.mark.unittest
+def test_post_child_location_concurrent_preserves_order():
+    import time
+
+    def create(location):
+        # Later barcodes finish first so completion order differs from input order
+        time.sleep(0.01 * (5 - int(location.barcode[-1])))
+        return MagicMock(id=f"id_{location.barcode}")
+
+    mock_benchling_client = MagicMock()
+    mock_benchling_client.locations.create.side_effect = create
+
+    barcodes = ["Barcode"] + [f"EQS-1234-S{i}-R1" for i in range(1, 5)]
+    actual = inventory_builder.post_child_location(
+        barcodes=barcodes,
+        names=["Name", "Rack 1", "Rack 1", "Rack 1", "Rack 1"],
+        parent_storage_id=["s1", "s2", "s3", "s4"],
+        location_schema="dev_rack_schema",
+        benchling_client=mock_benchling_client,
+        max_workers=4,
+    )
+
+    assert actual == [f"id_{e}" for e in barcodes[1:]]
+    for i in range(1, 5):
+        mock_benchling_client.locations.create.assert_any_call(
+            location=benchling_models.LocationCreate(
+                name="Rack 1",
+                schema_id="dev_rack_schema",
+                barcode=f"EQS-1234-S{i}-R1",
+                parent_storage_id=f"s{i}",
+            )
+        )
+
+
+@pytest.mark.unittest
+def test_main_async(tmp_path, monkeypatch):
+    import asyncio
+
+    from src import settings
+
+    from tests.test_pipeline import fake_client
+
+    monkeypatch.chdir(tmp_path)
+    mock_benchling_client = fake_client()
+    storage = settings.StorageConfig(
+        parent_barcode="EQS-1234",
+        parent_name="FREEZER_NAME",
+        shelves=2,
+        rack_prefix="R",
+        rack_in_full="Rack",
+        racks=3,
+        drawer_prefix="D",
+        drawer_in_full="Drawer",
+        drawers=2,
+        boxes=2,
+        box_dimension=1,
+    )
+
+    actual = asyncio.run(
+        inventory_builder.main_async(
+            storage=storage,
+            parameters=settings.DevelopmentSettings(),
+            benchling_client=mock_benchling_client,
+            box_schema="boxsch_xyz789",
+        )
+    )
+
+    assert actual == {"shelf": 2, "rack": 6, "drawer": 12, "box": 24}
+    assert mock_benchling_client.locations.create.call_count == 1 + 2 + 6 + 12
+    assert mock_benchling_client.boxes.create.call_count == 24
+    assert (tmp_path / "EQS-1234.index.sqlite").exists()
+
+
+@pytest.mark.unittest
+def test_post_box_in_parallel(capsys):
+    mock_benchling_client = MagicMock()
+    mock_benchling_client.boxes.create.side_effect = lambda box: MagicMock(
+        id=f"{box.parent_storage_id}/{box.name}"
+    )
+
+    actual = inventory_builder.post_box(
+        box_names=["Name", "Box 1", "Box 2", "Box 1", "Box 2"],
+        parent_storage_id=["d1", "d2"],
+        schema="boxsch_xyz789",
+        benchling_client=mock_benchling_client,
+        max_workers=2,
+    )
+
+    assert actual == ["d1/Box 1", "d1/Box 2", "d2/Box 1", "d2/Box 2"]
+    assert "4 of 4 boxes successfully created" in capsys.readouterr().out
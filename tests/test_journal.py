@@ -0,0 +1,82 @@
+import pytest
+
+from src import hierarchy
+from src import journal
+from src import pipeline
+from tests.test_pipeline import SCHEMAS, STORAGE, fake_client
+
+
+@pytest.mark.unittest
+def test_journal_round_trip(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+
+    with journal.Journal(str(path), sync_every=2) as run_journal:
+        run_journal.record("EQS-1234", "loc_1")
+        run_journal.record("EQS-1234-S1", "loc_2")
+        run_journal.record("EQS-1234-S1-R1/Box 1", "box_1")
+
+    assert journal.load(str(path)) == {
+        "EQS-1234": "loc_1",
+        "EQS-1234-S1": "loc_2",
+        "EQS-1234-S1-R1/Box 1": "box_1",
+    }
+
+
+@pytest.mark.unittest
+def test_load_ignores_truncated_last_line(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    path.write_text('{"key": "EQS-1234", "storage_id": "loc_1"}\n{"key": "EQS-12')
+
+    assert journal.load(str(path)) == {"EQS-1234": "loc_1"}
+
+
+@pytest.mark.unittest
+def test_journal_without_resume_keeps_an_earlier_run(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    path.write_text('{"key": "EQS-1234", "storage_id": "loc_1"}\n')
+
+    with pytest.raises(FileExistsError):
+        journal.Journal(str(path))
+    assert journal.load(str(path)) == {"EQS-1234": "loc_1"}
+
+    with journal.Journal(str(path), overwrite=True) as run_journal:
+        assert run_journal.get("EQS-1234") is None
+    assert journal.load(str(path)) == {}
+
+
+@pytest.mark.unittest
+def test_resume_after_a_crash_keeps_new_records(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    path.write_text('{"key": "A", "storage_id": "1"}\n{"key": "B')
+
+    with journal.Journal(str(path), resume=True) as run_journal:
+        run_journal.record("C", "3")
+
+    assert journal.load(str(path)) == {"A": "1", "C": "3"}
+
+
+@pytest.mark.unittest
+def test_resume_skips_created_nodes(tmp_path):
+    path = str(tmp_path / "run.journal.jsonl")
+
+    # First run dies after the first shelf and its first rack
+    with journal.Journal(path) as run_journal:
+        run_journal.record("EQS-1234-S1", "id_EQS-1234-S1")
+        run_journal.record("EQS-1234-S1-R1", "id_EQS-1234-S1-R1")
+
+    client = fake_client()
+    with journal.Journal(path, resume=True) as run_journal:
+        actual = pipeline.create_stream(
+            nodes=hierarchy.iter_nodes(STORAGE),
+            parent_barcode="EQS-1234",
+            parent_storage_id="freezer_id",
+            benchling_client=client,
+            schemas=SCHEMAS,
+            max_workers=2,
+            journal=run_journal,
+        )
+
+    assert actual == {"shelf": 2, "rack": 4, "box": 4}
+    assert client.locations.create.call_count == 6 - 2
+    assert client.boxes.create.call_count == 4
+    assert journal.load(path)["EQS-1234-S1-R1/Box 1"] == "id_EQS-1234-S1-R1/Box 1"
@@ -0,0 +1,72 @@
+import io
+import json
+import logging
+
+import pytest
+
+from src import log
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    monkeypatch.setattr(log, "_bound", {})
+    stream = io.StringIO()
+    yield stream
+    log.configure()
+
+
+def records(stream):
+    log.shutdown()  # Flushes the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+@pytest.mark.unittest
+def test_json_records_with_context(stream):
+    logger = log.configure(level="INFO", stream=stream)
+    log.bind(tenant="dev")
+
+    with log.context(parent_barcode="EQS-1"):
+        logger.info("created", extra={"fields": {"barcode": "EQS-1-S1", "latency": 0.1}})
+    logger.warning("done")
+
+    first, second = records(stream)
+    assert first["message"] == "created"
+    assert first["function"] == "test_json_records_with_context"
+    assert (first["tenant"], first["parent_barcode"], first["barcode"]) == (
+        "dev", "EQS-1", "EQS-1-S1"
+    )
+    assert second["level"] == "WARNING" and "parent_barcode" not in second
+
+
+@pytest.mark.unittest
+def test_sampling(stream):
+    logger = log.configure(level="DEBUG", stream=stream, sample={"DEBUG": 0.1, "INFO": 0})
+
+    for number in range(100):
+        logger.debug(f"debug {number}")
+        logger.info("dropped")
+    logger.error("kept")
+
+    levels = [e["level"] for e in records(stream)]
+    assert levels.count("DEBUG") == 10
+    assert levels.count("ERROR") == 1 and "INFO" not in levels
+
+
+@pytest.mark.unittest
+def test_configure_is_idempotent(stream):
+    log.configure(stream=stream)
+    log.configure(stream=stream)
+    log.logger()
+
+    handlers = logging.getLogger(log.NAME).handlers
+    assert len([e for e in handlers if isinstance(e, log.ContextQueueHandler)]) == 1
+
+
+@pytest.mark.unittest
+def test_fields_do_not_replace_the_severity(stream):
+    logger = log.configure(level="DEBUG", stream=stream)
+
+    logger.debug("created", extra={"fields": {"level": "rack", "message": "x"}})
+
+    (record,) = records(stream)
+    assert (record["level"], record["message"]) == ("DEBUG", "created")
@@ -0,0 +1,77 @@
+import pickle
+
+import pytest
+
+from unittest.mock import MagicMock
+from benchling_sdk.errors import BenchlingError
+
+from src import metrics
+from src import throttle
+
+
+@pytest.fixture
+def run_metrics(monkeypatch):
+    monkeypatch.setattr(throttle.time, "sleep", lambda seconds: None)
+    yield metrics.reset()
+    metrics.reset()
+
+
+@pytest.mark.unittest
+def test_histogram_quantiles():
+    histogram = metrics.Histogram()
+    for seconds in [0.004] * 90 + [0.2] * 10:
+        histogram.observe(seconds)
+
+    assert histogram.counts[0] == 90
+    assert histogram.quantile(0.5) <= 0.005
+    assert 0.1 < histogram.quantile(0.99) <= 0.25
+
+
+@pytest.mark.unittest
+def test_call_records_attempts_and_retries(run_metrics):
+    error = BenchlingError(status_code=429, headers={}, json=None, content=None, parsed=None)
+    fn = MagicMock(side_effect=[error, MagicMock(id="loc_1")])
+
+    throttle.AdaptiveThrottle().call(fn, endpoint="locations.create", level="rack")
+
+    report = run_metrics.report()
+    assert report["objects"] == 1
+    assert report["calls"][0]["attempts"] == 2
+    assert report["calls"][0]["outcomes"] == {"429": 1, "ok": 1}
+    assert report["retries"] == [{"endpoint": "locations.create", "reason": "429", "count": 1}]
+    assert report["throttle_events"] == 1
+    assert report["max_in_flight"] == 1
+
+
+@pytest.mark.unittest
+def test_write_report(run_metrics, tmp_path):
+    run_metrics.observe("boxes.create", "box", 0.03, "ok")
+
+    report = metrics.write_report(str(tmp_path / "m.json"), str(tmp_path / "m.prom"))
+
+    assert report["objects"] == 1
+    assert (tmp_path / "m.json").exists()
+    prometheus = (tmp_path / "m.prom").read_text()
+    bucket = 'inventory_call_duration_seconds_bucket{endpoint="boxes.create",level="box"'
+    assert f'{bucket},le="0.05"}} 1' in prometheus
+    assert "inventory_objects_total 1" in prometheus
+
+
+@pytest.mark.unittest
+def test_merge_adds_pickled_worker_metrics(run_metrics):
+    workers = []
+    for limit in (2, 3):
+        worker = metrics.RunMetrics()
+        worker.observe("boxes.create", "box", 0.03, "ok")
+        worker.retried("boxes.create", "500")
+        worker.set_in_flight(limit, limit)
+        workers.append(pickle.loads(pickle.dumps(worker)))
+
+    run_metrics.observe("locations.create", "parent", 0.2, "ok")
+    run_metrics.merge(*workers)
+
+    report = run_metrics.report()
+    assert report["objects"] == 3
+    assert report["calls"][0]["attempts"] == 2
+    assert report["retries"] == [{"endpoint": "boxes.create", "reason": "500", "count": 2}]
+    assert report["max_in_flight"] == report["concurrency_limit"] == 5
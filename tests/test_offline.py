@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+import pytest
+
+from src import hierarchy
+from src import offline
+from tests.test_pipeline import STORAGE
+
+
+@pytest.mark.unittest
+def test_write_csv(tmp_path):
+    path = tmp_path / "inventory_locations.csv"
+
+    rows = offline.write_csv(STORAGE, str(path))
+
+    assert rows == sum(hierarchy.count_nodes(STORAGE).values())
+    assert path.read_text().splitlines()[:3] == [
+        "Location Barcode,Barcode,Name",
+        "EQS-1234,EQS-1234-S1,Shelf 1",
+        "EQS-1234-S1,EQS-1234-S1-R1,Rack 1",
+    ]
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("module", ["src.offline", "src.inventory_builder"])
+def test_startup_skips_sdk_and_aws_imports(module):
+    check = f"import sys, {module}; print('benchling_sdk' in sys.modules, 'boto3' in sys.modules)"
+
+    output = subprocess.run(
+        [sys.executable, "-c", check], check=True, capture_output=True, text=True
+    ).stdout
+
+    assert output.split() == ["False", "False"]
@@ -0,0 +1,260 @@
+import threading
+
+import pytest
+
+from unittest.mock import MagicMock
+
+import httpx
+from benchling_sdk import models as benchling_models
+from benchling_sdk.errors import BenchlingError
+
+from src import hierarchy
+from src import pipeline
+from src import settings
+from src import standin
+from src import throttle
+
+
+def fake_client():
+    "Client whose creates return the barcode (or parent/name for boxes) as the id"
+    client = MagicMock()
+    client.locations.create.side_effect = lambda location: MagicMock(
+        id=f"id_{location.barcode}"
+    )
+    client.boxes.create.side_effect = lambda box: MagicMock(
+        id=f"{box.parent_storage_id}/{box.name}"
+    )
+    return client
+
+
+STORAGE = settings.StorageConfig(
+    parent_barcode="EQS-1234",
+    parent_name="FREEZER_NAME",
+    shelves=2,
+    rack_prefix="R",
+    rack_in_full="Rack",
+    racks=2,
+    drawer_prefix=None,
+    drawer_in_full=None,
+    drawers=0,
+    boxes=1,
+    box_dimension=1,
+)
+
+SCHEMAS = {
+    "shelf": "dev_shelf_schema",
+    "rack": "dev_rack_schema",
+    "drawer": "dev_drawer_schema",
+    "box": "boxsch_xyz789",
+}
+
+
+def created_ids(client):
+    return sorted(
+        [call.kwargs["location"].barcode for call in client.locations.create.call_args_list]
+        + [
+            f"{call.kwargs['box'].parent_storage_id}/{call.kwargs['box'].name}"
+            for call in client.boxes.create.call_args_list
+        ]
+    )
+
+
+@pytest.mark.unittest
+def test_create_stream_links_children_to_their_parent():
+    client = fake_client()
+
+    actual = pipeline.create_stream(
+        nodes=hierarchy.iter_nodes(STORAGE),
+        parent_barcode="EQS-1234",
+        parent_storage_id="freezer_id",
+        benchling_client=client,
+        schemas=SCHEMAS,
+        max_workers=2,
+    )
+
+    assert actual == {"shelf": 2, "rack": 4, "box": 4}
+    assert created_ids(client) == [
+        "EQS-1234-S1",
+        "EQS-1234-S1-R1",
+        "EQS-1234-S1-R2",
+        "EQS-1234-S2",
+        "EQS-1234-S2-R1",
+        "EQS-1234-S2-R2",
+        "id_EQS-1234-S1-R1/Box 1",
+        "id_EQS-1234-S1-R2/Box 1",
+        "id_EQS-1234-S2-R1/Box 1",
+        "id_EQS-1234-S2-R2/Box 1",
+    ]
+    shelf_call = client.locations.create.call_args_list[0].kwargs["location"]
+    assert shelf_call.parent_storage_id == "freezer_id"
+    assert shelf_call.schema_id == "dev_shelf_schema"
+
+
+@pytest.mark.unittest
+def test_create_stream_does_not_wait_for_whole_level():
+    """Racks of shelf 1 are created while shelf 2 is still in flight"""
+    shelf_2_release = threading.Event()
+    client = fake_client()
+    create = client.locations.create.side_effect
+
+    def slow_shelf_2(location):
+        if location.barcode == "EQS-1234-S2":
+            assert shelf_2_release.wait(timeout=5)
+        if location.barcode == "EQS-1234-S1-R2":
+            shelf_2_release.set()
+        return create(location=location)
+
+    client.locations.create.side_effect = slow_shelf_2
+
+    # Reorder the stream so shelf 2 is requested before the racks of shelf 1
+    nodes = sorted(hierarchy.iter_nodes(STORAGE), key=lambda e: e.level != "shelf")
+
+    actual = pipeline.create_stream(
+        nodes=nodes,
+        parent_barcode="EQS-1234",
+        parent_storage_id="freezer_id",
+        benchling_client=client,
+        schemas=SCHEMAS,
+        max_workers=2,
+    )
+    assert actual["box"] == 4
+
+
+@pytest.mark.unittest
+def test_create_stream_bounds_buffered_nodes():
+    pulled = 0
+
+    def counting(nodes):
+        nonlocal pulled
+        for node in nodes:
+            pulled += 1
+            yield node
+
+    client = fake_client()
+    seen = []
+    create = client.boxes.create.side_effect
+
+    def record(box):
+        seen.append(pulled)
+        return create(box=box)
+
+    client.boxes.create.side_effect = record
+
+    pipeline.create_stream(
+        nodes=counting(hierarchy.iter_nodes(STORAGE)),
+        parent_barcode="EQS-1234",
+        parent_storage_id="freezer_id",
+        benchling_client=client,
+        schemas=SCHEMAS,
+        max_workers=1,
+        max_buffered=2,
+    )
+    # The first box is created long before the whole stream has been pulled
+    assert seen[0] < 10
+
+
+@pytest.mark.unittest
+def test_create_stream_rejects_orphans():
+    with pytest.raises(ValueError):
+        pipeline.create_stream(
+            nodes=hierarchy.iter_nodes(STORAGE),
+            parent_barcode="EQS-9999",
+            parent_storage_id="freezer_id",
+            benchling_client=fake_client(),
+            schemas=SCHEMAS,
+            max_workers=2,
+        )
+
+
+def commit_then_fail(create, error):
+    "create, whose first call commits the object and then fails with error"
+    calls = []
+
+    def once(**kwargs):
+        calls.append(kwargs)
+        stored = create(**kwargs)
+        if len(calls) == 1:
+            raise error
+        return stored
+
+    return once
+
+
+@pytest.mark.unittest
+def test_retried_creates_do_not_duplicate(monkeypatch):
+    monkeypatch.setattr(throttle.time, "sleep", lambda seconds: None)
+    client = standin.FakeBenchling(latency=0)
+    client.locations.create = commit_then_fail(
+        client.locations.create, httpx.ReadTimeout("timed out")
+    )
+    client.boxes.create = commit_then_fail(
+        client.boxes.create, httpx.ReadTimeout("timed out")
+    )
+
+    rack = pipeline.post_create(
+        benchling_models.LocationCreate(name="Rack 1", schema_id="locsch", barcode="R1"),
+        client,
+    )
+    box = pipeline.post_create(
+        benchling_models.BoxCreate(name="Box 1", schema_id="boxsch", parent_storage_id=rack),
+        client,
+    )
+
+    assert [e.id for e in client.objects.values()] == [rack, box]
+    # The location is recovered from its conflict, the box found before a second POST
+    assert client.errors == {409: 1}
+    assert client.calls["boxes.create"] == 1
+
+
+@pytest.mark.unittest
+def test_first_barcode_conflict_is_not_recovered():
+    client = standin.FakeBenchling(latency=0)
+    create = benchling_models.LocationCreate(name="Rack 1", schema_id="locsch", barcode="R1")
+    client.locations.create(location=create)
+
+    # The barcode was taken before this create, not by an attempt of it
+    with pytest.raises(BenchlingError):
+        pipeline.post_create(create, client)
+
+
+@pytest.mark.unittest
+def test_retried_barcode_conflict_under_another_parent_is_not_recovered(monkeypatch):
+    monkeypatch.setattr(throttle.time, "sleep", lambda seconds: None)
+    client = standin.FakeBenchling(latency=0)
+    shelves = [
+        pipeline.post_create(
+            benchling_models.LocationCreate(name=name, schema_id="locsch", barcode=name),
+            client,
+        )
+        for name in ["S1", "S2"]
+    ]
+    pipeline.post_create(
+        benchling_models.LocationCreate(
+            name="Rack 1", schema_id="locsch", barcode="R1", parent_storage_id=shelves[0]
+        ),
+        client,
+    )
+    create = client.locations.create
+    attempts = []
+
+    def fail_once(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) == 1:
+            raise httpx.ReadTimeout("timed out")
+        return create(**kwargs)
+
+    client.locations.create = fail_once
+
+    # Same barcode and name, but not the rack this create asked for
+    with pytest.raises(BenchlingError) as conflict:
+        pipeline.post_create(
+            benchling_models.LocationCreate(
+                name="Rack 1",
+                schema_id="locsch",
+                barcode="R1",
+                parent_storage_id=shelves[1],
+            ),
+            client,
+        )
+    assert conflict.value.status_code == 409
+    assert len(attempts) == 2
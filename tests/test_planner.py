@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from src import planner
+from src import settings
+from tests.test_hierarchy import DRAWERS
+from tests.test_pipeline import STORAGE
+
+
+@pytest.mark.unittest
+def test_plan_counts_and_estimate():
+    storage = STORAGE.model_copy(update=DRAWERS)  # 2 shelves, 4 racks, 12 drawers, 24 boxes
+
+    plan = planner.plan(storage, settings.DevelopmentSettings(max_workers=8), latency=0.1)
+
+    assert plan.objects == {"parent": 1, "shelf": 2, "rack": 4, "drawer": 12, "box": 24}
+    assert plan.creates == plan.calls == 43
+    assert plan.seconds == pytest.approx(0.6)  # ceil(43 / 8) rounds of 0.1s
+    assert plan.warnings == []
+
+
+@pytest.mark.unittest
+def test_plan_resumed_and_reconciled():
+    plan = planner.plan(
+        STORAGE,
+        settings.DevelopmentSettings(max_workers=2),
+        existing=3,
+        reconcile_with_tenant=True,
+        latency=1.0,
+    )
+
+    assert plan.creates == 8
+    assert plan.list_calls == 3  # Parent lookup, one page of locations, one of boxes
+    assert plan.seconds == 3 + 4  # 8 creates, 2 at a time
+
+
+@pytest.mark.unittest
+def test_rate_limit_warning_and_budget():
+    parameters = settings.DevelopmentSettings(max_workers=8, rate_limit=5)
+
+    plan = planner.plan(STORAGE, parameters, latency=0.1)
+
+    assert plan.warnings and plan.seconds == 11 / 5
+    planner.preflight([plan], call_budget=11)
+    with pytest.raises(planner.BudgetExceeded):
+        planner.preflight([plan, plan], call_budget=20)
+
+
+@pytest.mark.unittest
+def test_zero_latency_is_not_replaced_by_the_default():
+    parameters = settings.DevelopmentSettings(rate_limit=5)
+
+    plan = planner.plan(STORAGE, parameters, latency=0.0)
+
+    # A --dry_run_latency 0 run is only bound by the rate limit
+    assert plan.latency == 0.0 and plan.seconds == 11 / 5
+    assert planner.plan(STORAGE, parameters).latency == planner.DEFAULT_LATENCY
+
+
+@pytest.mark.unittest
+def test_measured_latency(tmp_path):
+    path = tmp_path / "metrics.json"
+    path.write_text(
+        json.dumps(
+            {
+                "calls": [
+                    {"endpoint": "locations.create", "attempts": 4, "seconds": 1.0},
+                    {"endpoint": "boxes.create", "attempts": 1, "seconds": 0.5},
+                    {"endpoint": "locations.list", "attempts": 5, "seconds": 9.0},
+                ]
+            }
+        )
+    )
+
+    assert planner.measured_latency(str(path)) == pytest.approx(0.3)
+    assert planner.measured_latency(str(tmp_path / "missing.json")) is None
@@ -0,0 +1,74 @@
+import pytest
+
+from unittest.mock import MagicMock
+
+from src import hierarchy
+from src import reconcile
+from tests.test_pipeline import STORAGE
+
+
+def page_iterator(pages):
+    iterator = MagicMock()
+    iterator.__iter__.return_value = iter(pages)
+    iterator.first.return_value = pages[0][0] if pages and pages[0] else None
+    return iterator
+
+
+def storage(id, barcode=None, name=None, parent_storage_id=None):
+    e = MagicMock(id=id, barcode=barcode, parent_storage_id=parent_storage_id)
+    e.name = name
+    return e
+
+
+@pytest.mark.unittest
+def test_fetch_existing_indexes_all_pages():
+    client = MagicMock()
+    parent = storage("loc_parent", barcode="EQS-1234")
+    client.locations.list.side_effect = lambda **kwargs: (
+        page_iterator([[parent]])
+        if "barcodes" in kwargs
+        else page_iterator(
+            [
+                [storage("loc_s1", barcode="EQS-1234-S1")],
+                [storage("loc_s1_r1", barcode="EQS-1234-S1-R1")],
+            ]
+        )
+    )
+    client.boxes.list.return_value = page_iterator(
+        [[storage("box_1", name="Box 1", parent_storage_id="loc_s1_r1")]]
+    )
+
+    actual = reconcile.fetch_existing(client, "EQS-1234")
+
+    assert actual == {
+        "EQS-1234": "loc_parent",
+        "EQS-1234-S1": "loc_s1",
+        "EQS-1234-S1-R1": "loc_s1_r1",
+        "EQS-1234-S1-R1/Box 1": "box_1",
+    }
+    client.locations.list.assert_any_call(
+        ancestor_storage_id="loc_parent", page_size=100
+    )
+
+
+@pytest.mark.unittest
+def test_fetch_existing_without_parent():
+    client = MagicMock()
+    client.locations.list.return_value = page_iterator([[]])
+
+    assert reconcile.fetch_existing(client, "EQS-1234") == {}
+    client.boxes.list.assert_not_called()
+
+
+@pytest.mark.unittest
+def test_summarize(capsys):
+    existing = {
+        "EQS-1234-S1": "loc_s1",
+        "EQS-1234-S1-R1": "loc_s1_r1",
+        "EQS-1234-S1-R1/Box 1": "box_1",
+    }
+
+    actual = reconcile.summarize(hierarchy.iter_nodes(STORAGE), existing)
+
+    assert actual == {"shelf": 1, "rack": 3, "box": 3}
+    assert "Box: 1 of 4 already exist, 3 to create" in capsys.readouterr().out
@@ -0,0 +1,80 @@
+import pytest
+
+from unittest.mock import MagicMock
+
+from src import schemas
+from src import settings
+from tests.test_hierarchy import DRAWERS
+from tests.test_pipeline import STORAGE
+from tests.test_reconcile import page_iterator
+
+
+def schema(id, name):
+    e = MagicMock(id=id)
+    e.name = name
+    return e
+
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.schemas.list_location_schemas.return_value = page_iterator(
+        [
+            [schema("dev_freezer_schema", "Freezer"), schema("dev_shelf_schema", "Shelf")],
+            [schema("dev_rack_schema", "Rack")],
+        ]
+    )
+    client.schemas.list_box_schemas.return_value = page_iterator(
+        [[schema("boxsch_xyz789", "9x9 Box")]]
+    )
+    return client
+
+
+@pytest.mark.unittest
+def test_box_schema_id_lookup():
+    assert settings.box_schema_id(n_dimension=2, tenant="orgtest") == "boxsch_xyz456"
+    with pytest.raises(ValueError):
+        settings.box_schema_id(n_dimension=3, tenant="orgdev")
+
+
+@pytest.mark.unittest
+def test_required():
+    parameters = settings.DevelopmentSettings()
+
+    assert schemas.required([STORAGE], parameters) == {
+        "location": {
+            "parent": "dev_freezer_schema",
+            "shelf": "dev_shelf_schema",
+            "rack": "dev_rack_schema",
+        },
+        "box": {"dimension 1": "boxsch_xyz789"},
+    }
+    drawers = STORAGE.model_copy(update=dict(DRAWERS, box_dimension=2))
+    assert schemas.required([STORAGE, drawers], parameters)["box"] == {
+        "dimension 1": "boxsch_xyz789",
+        "dimension 2": "boxsch_xyz987",
+    }
+
+
+@pytest.mark.unittest
+def test_validate_uses_the_disk_cache(client, tmp_path):
+    path = str(tmp_path / "schemas.json")
+    required = schemas.required([STORAGE], settings.DevelopmentSettings())
+
+    schemas.SchemaRegistry(client, "orgdev", path=path).validate(required)
+    schemas.SchemaRegistry(client, "orgdev", path=path).validate(required)
+
+    assert client.schemas.list_location_schemas.call_count == 1
+    assert client.schemas.list_box_schemas.call_count == 1
+
+
+@pytest.mark.unittest
+def test_validate_reports_every_unknown_schema(client, tmp_path):
+    storage = STORAGE.model_copy(update=dict(DRAWERS, box_dimension=2))
+    registry = schemas.SchemaRegistry(client, "orgdev", path=None)
+
+    with pytest.raises(schemas.UnknownSchema) as e:
+        registry.validate(schemas.required([storage], settings.DevelopmentSettings()))
+
+    assert "drawer location schema dev_drawer_schema" in str(e.value)
+    assert "dimension 2 box schema boxsch_xyz987" in str(e.value)
@@ -0,0 +1,127 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import hierarchy
+from src import inventory_builder
+from src import metrics
+from src import settings
+from src import shard
+from src import standin
+from src.journal import Journal
+from tests.test_pipeline import STORAGE, fake_client
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("shelves, shards", [(5, 2), (3, 3), (2, 8)])
+def test_split_covers_every_shelf_once(shelves, shards):
+    actual = shard.split(STORAGE.model_copy(update=dict(shelves=shelves)), shards)
+
+    assert [ordinal for top in actual for ordinal in top] == list(range(1, shelves + 1))
+    assert len(actual) == min(shelves, shards)
+
+
+def fake_session(tenant, auth, **kwargs):
+    "Stand-in holding the parent location, as loc_00000001"
+    benchling_client = standin.FakeBenchling(latency=0)
+    benchling_client.store("loc", STORAGE.parent_barcode, "FREEZER_NAME", "locsch", None)
+    return benchling_client
+
+
+def fake_sessions():
+    "Initializer of a worker process, whose sessions are stand-ins"
+    inventory_builder.create_session = fake_session
+
+
+@pytest.mark.unittest
+def test_build_sharded_merges_ids_and_csv(tmp_path, monkeypatch):
+    storage = STORAGE.model_copy(update=dict(shelves=3))
+    clients = []
+    monkeypatch.setattr(
+        inventory_builder,
+        "create_session",
+        lambda tenant, auth, **kwargs: clients.append(fake_client()) or clients[-1],
+    )
+    output = tmp_path / "inventory_locations.csv"
+
+    with Journal(str(tmp_path / "run.journal.jsonl")) as journal:
+        completed, storage_ids = shard.build_sharded(
+            storage,
+            settings.DevelopmentSettings(),
+            {"client_id": "id", "client_secret": "secret"},
+            "boxsch_xyz789",
+            "id_EQS-1234",
+            shards=2,
+            journal=journal,
+            output_path=str(output),
+            executor=ThreadPoolExecutor(max_workers=2),
+        )
+
+    assert len(clients) == 2
+    assert completed == {"shelf": 3, "rack": 6, "box": 6}
+    nodes = list(hierarchy.iter_nodes(storage))
+    assert set(storage_ids) == {"EQS-1234"} | {node.key for node in nodes}
+    assert storage_ids["EQS-1234-S3-R2"] == "id_EQS-1234-S3-R2"
+
+    rows = output.read_text().splitlines()
+    assert rows[0] == "Location Barcode,Barcode,Name"
+    assert [row.split(",")[1] or None for row in rows[1:]] == [e.barcode for e in nodes]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "inventory_locations.csv",
+        "run.journal.jsonl",
+        "run.journal.part0.jsonl",
+        "run.journal.part1.jsonl",
+    ]
+
+
+@pytest.mark.unittest
+def test_build_sharded_merges_worker_metrics(tmp_path):
+    storage = STORAGE.model_copy(update=dict(shelves=3))
+    run_metrics = metrics.reset()
+
+    completed, _ = shard.build_sharded(
+        storage,
+        settings.DevelopmentSettings(),
+        {"client_id": "id", "client_secret": "secret"},
+        "boxsch_xyz789",
+        "loc_00000001",
+        shards=2,
+        output_path=str(tmp_path / "inventory_locations.csv"),
+        executor=ProcessPoolExecutor(
+            max_workers=2,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=fake_sessions,
+        ),
+    )
+
+    report = run_metrics.report()
+    assert report["objects"] == sum(completed.values()) == 15
+    assert {e["endpoint"] for e in report["calls"]} == {"locations.create", "boxes.create"}
+    metrics.reset()
+
+
+@pytest.mark.unittest
+def test_build_sharded_workers_share_the_credential_cache(tmp_path, monkeypatch):
+    sessions = []
+
+    def record_session(tenant, auth, cache=None, secret_name=None):
+        sessions.append((cache.path, secret_name))
+        return fake_session(tenant, auth)
+
+    monkeypatch.setattr(inventory_builder, "create_session", record_session)
+
+    shard.build_sharded(
+        STORAGE,
+        settings.DevelopmentSettings(),
+        {"client_id": "id", "client_secret": "secret"},
+        "boxsch_xyz789",
+        "loc_00000001",
+        shards=2,
+        output_path=str(tmp_path / "inventory_locations.csv"),
+        executor=ThreadPoolExecutor(max_workers=2),
+        cache_path=str(tmp_path / "credentials.bin"),
+    )
+
+    assert sessions == [(str(tmp_path / "credentials.bin"), "benchling-inventory")] * 2
@@ -0,0 +1,103 @@
+import csv
+import gzip
+import zlib
+
+import pytest
+
+from src import hierarchy
+from src import inventory_builder
+from src import sinks
+from tests.test_pipeline import STORAGE
+
+
+def read_rows(f):
+    return list(csv.reader(f))
+
+
+@pytest.mark.unittest
+def test_tee_writes_each_node_once(tmp_path):
+    path = tmp_path / "inventory_locations.csv"
+
+    with sinks.CsvSink(str(path)) as sink:
+        actual = list(sink.tee(hierarchy.iter_nodes(STORAGE)))
+
+    with open(path, newline="") as f:
+        rows = read_rows(f)
+    assert len(actual) == len(rows) - 1 == sink.rows == 10
+    assert rows[:4] == [
+        ["Location Barcode", "Barcode", "Name"],
+        ["EQS-1234", "EQS-1234-S1", "Shelf 1"],
+        ["EQS-1234-S1", "EQS-1234-S1-R1", "Rack 1"],
+        ["EQS-1234-S1-R1", "", "Box 1"],
+    ]
+
+
+@pytest.mark.unittest
+def test_gzip_output(tmp_path):
+    path = tmp_path / "inventory_locations.csv.gz"
+
+    with sinks.CsvSink(str(path)) as sink:
+        for node in hierarchy.iter_nodes(STORAGE):
+            sink.write(node)
+
+    with gzip.open(path, "rt", newline="") as f:
+        rows = read_rows(f)
+    assert sink.compress
+    assert len(rows) == 11
+
+
+@pytest.mark.unittest
+def test_gzip_flush_is_readable_before_close(tmp_path):
+    path = tmp_path / "inventory_locations.csv.gz"
+
+    with sinks.CsvSink(str(path)) as sink:
+        sink.write_row(["EQS-1234", "EQS-1234-S1", "Shelf 1"])
+        sink.flush()
+        # A sync flush ends on a block boundary, the stream just has no trailer yet
+        text = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(path.read_bytes())
+
+    assert text.decode().splitlines() == [
+        "Location Barcode,Barcode,Name",
+        "EQS-1234,EQS-1234-S1,Shelf 1",
+    ]
+
+
+@pytest.mark.unittest
+def test_flush_every(tmp_path):
+    path = tmp_path / "inventory_locations.csv"
+
+    with sinks.CsvSink(str(path), flush_every=2) as sink:
+        sink.write_row(["EQS-1234", "EQS-1234-S1", "Shelf 1"])
+        assert path.read_text().count("\n") == 0
+        sink.write_row(["EQS-1234", "EQS-1234-S2", "Shelf 2"])
+        assert path.read_text().count("\n") == 3
+
+
+@pytest.mark.unittest
+def test_write_functions_share_one_sink(tmp_path):
+    path = tmp_path / "inventory_locations.csv"
+
+    with sinks.CsvSink(str(path)) as sink:
+        shelf = inventory_builder.write_shelves(2, "EQS-1234", sink=sink)
+        rack = inventory_builder.write_racks_or_canes(
+            shelves=2,
+            rack_prefix="R",
+            rack_in_full="Rack",
+            racks=1,
+            parent_barcode="EQS-1234",
+            shelf_barcodes=shelf.barcodes,
+            sink=sink,
+        )
+        inventory_builder.write_boxes(boxes=1, barcodes=rack.barcodes, sink=sink)
+
+    with open(path, newline="") as f:
+        rows = read_rows(f)
+    assert rows == [
+        ["Location Barcode", "Barcode", "Name"],
+        ["EQS-1234", "EQS-1234-S1", "Shelf 1"],
+        ["EQS-1234", "EQS-1234-S2", "Shelf 2"],
+        ["EQS-1234-S1", "EQS-1234-S1-R1", "Rack 1"],
+        ["EQS-1234-S2", "EQS-1234-S2-R1", "Rack 1"],
+        ["EQS-1234-S1-R1", "", "Box 1"],
+        ["EQS-1234-S2-R1", "", "Box 1"],
+    ]
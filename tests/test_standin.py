@@ -0,0 +1,93 @@
+import pytest
+
+from click.testing import CliRunner
+from benchling_sdk import models as benchling_models
+from benchling_sdk.errors import BenchlingError
+
+from src import inventory_builder
+from src import reconcile
+from src import settings
+from src import standin
+from src import throttle
+from tests.test_pipeline import STORAGE
+
+
+@pytest.mark.unittest
+def test_main_dry_run_against_stand_in(tmp_path):
+    client = standin.FakeBenchling(latency=0.001, error_rate=0.1, throttle_rate=0.1, seed=7)
+    throttle.configure(max_concurrency=8, base_delay=0.001, max_delay=0.01, max_retries=20)
+    client.retry_after = 0.001
+
+    try:
+        completed = inventory_builder.main(
+            STORAGE,
+            settings.DevelopmentSettings(),
+            client,
+            "boxsch_xyz789",
+            output_path=str(tmp_path / "inventory_locations.csv"),
+        )
+    finally:
+        throttle.configure()
+
+    assert completed == {"shelf": 2, "rack": 4, "box": 4}
+    assert client.errors[429] > 0 and client.errors[500] > 0
+    # Every failed call was retried, and the tenant ends up with the whole hierarchy
+    client.error_rate = client.throttle_rate = 0
+    assert reconcile.fetch_existing(client, "EQS-1234").keys() == {
+        "EQS-1234",
+        "EQS-1234-S1",
+        "EQS-1234-S2",
+        "EQS-1234-S1-R1",
+        "EQS-1234-S1-R2",
+        "EQS-1234-S2-R1",
+        "EQS-1234-S2-R2",
+        "EQS-1234-S1-R1/Box 1",
+        "EQS-1234-S1-R2/Box 1",
+        "EQS-1234-S2-R1/Box 1",
+        "EQS-1234-S2-R2/Box 1",
+    }
+
+
+@pytest.mark.unittest
+def test_cli_dry_run_keeps_its_journal_in_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        settings, "env_variables", lambda instance: settings.DevelopmentSettings()
+    )
+    monkeypatch.setattr(settings.collect_input, "main", lambda **kwargs: STORAGE)
+
+    def dry_run():
+        try:
+            result = CliRunner().invoke(
+                inventory_builder.cli, ["--dry_run", "--dry_run_latency", "0"]
+            )
+        finally:
+            throttle.configure()
+        assert result.exit_code == 0, result.output
+        assert "Dry run:" in result.output
+
+    dry_run()
+    assert list(tmp_path.glob("*.journal.jsonl")) == []
+    assert (tmp_path / "inventory_locations.dry_run.csv").exists()
+
+    # An earlier real run's journal is neither refused, read nor replaced
+    real = tmp_path / "EQS-1234.journal.jsonl"
+    real.write_text('{"key": "EQS-1234-S1", "storage_id": "loc_1"}\n')
+    dry_run()
+    assert real.read_text() == '{"key": "EQS-1234-S1", "storage_id": "loc_1"}\n'
+
+
+@pytest.mark.unittest
+def test_stand_in_rate_limit_and_duplicate_barcodes():
+    client = standin.FakeBenchling(latency=0, rate_limit=2)
+    create = benchling_models.LocationCreate(name="Shelf 1", schema_id="x", barcode="EQS-1")
+
+    client.locations.create(location=create)
+    with pytest.raises(BenchlingError) as duplicate:
+        client.locations.create(location=create)
+    with pytest.raises(BenchlingError) as throttled:
+        client.locations.create(location=create)
+
+    assert duplicate.value.status_code == 409
+    assert throttled.value.status_code == 429
+    assert 0 < throttle.retry_after(throttled.value.headers) <= 0.5
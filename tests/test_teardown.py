@@ -0,0 +1,89 @@
+import httpx
+import pytest
+from benchling_sdk.errors import BenchlingError
+
+from src import hierarchy
+from src import inventory_builder
+from src import settings
+from src import standin
+from src import teardown
+from src import throttle
+from tests.test_hierarchy import DRAWERS
+from tests.test_pipeline import STORAGE, commit_then_fail
+
+
+@pytest.fixture
+def built(tmp_path):
+    "A tenant stand-in with the whole hierarchy created"
+
+    client = standin.FakeBenchling(latency=0)
+    storage = STORAGE.model_copy(update=DRAWERS)
+    inventory_builder.main(
+        storage,
+        settings.DevelopmentSettings(),
+        client,
+        "boxsch_xyz789",
+        output_path=str(tmp_path / "inventory_locations.csv"),
+    )
+    return client, storage
+
+
+@pytest.mark.unittest
+def test_plan_orders_leaves_first(built):
+    client, storage = built
+
+    waves = teardown.plan(client, storage.parent_barcode)
+
+    counts = hierarchy.count_nodes(storage)
+    assert [len(wave.ids) for wave in waves] == [
+        counts["box"], counts["drawer"], counts["rack"], counts["shelf"], 1
+    ]
+    assert waves[0].endpoint == "boxes.archive" and waves[-1].level == "parent"
+
+
+@pytest.mark.unittest
+def test_teardown_archives_everything(built):
+    client, storage = built
+    waves = teardown.plan(client, storage.parent_barcode)
+
+    archived = teardown.teardown(client, waves, max_workers=4, batch_size=5)
+
+    assert archived == len(client.objects)
+    assert all(e.archived and e.barcode is None for e in client.objects.values())
+    assert client.calls["boxes.archive"] == -(-len(waves[0].ids) // 5)
+    assert teardown.plan(client, storage.parent_barcode) == []
+
+
+@pytest.mark.unittest
+def test_plan_without_parent():
+    assert teardown.plan(standin.FakeBenchling(latency=0), "EQS-0000") == []
+
+
+@pytest.mark.unittest
+def test_retried_archive_of_an_archived_batch_succeeds(built, monkeypatch):
+    monkeypatch.setattr(throttle.time, "sleep", lambda seconds: None)
+    client, storage = built
+    waves = teardown.plan(client, storage.parent_barcode)
+    # The first call archives its boxes, but its response is lost
+    client.boxes.archive = commit_then_fail(
+        client.boxes.archive, httpx.ReadTimeout("timed out")
+    )
+
+    archived = teardown.teardown(
+        client, waves, max_workers=1, batch_size=len(waves[0].ids)
+    )
+
+    assert archived == len(client.objects)
+    assert client.errors == {400: 1}
+    assert teardown.plan(client, storage.parent_barcode) == []
+
+
+@pytest.mark.unittest
+def test_first_archive_of_an_archived_batch_fails(built):
+    client, storage = built
+    waves = teardown.plan(client, storage.parent_barcode)
+    teardown.teardown(client, waves[:1], max_workers=1)
+
+    with pytest.raises(BenchlingError) as error:
+        teardown.teardown(client, waves[:1], max_workers=1)
+    assert teardown.already_archived(error.value)
@@ -0,0 +1,98 @@
+import pytest
+
+from unittest.mock import MagicMock
+from benchling_sdk.errors import BenchlingError
+
+from src import throttle
+
+
+def benchling_error(status_code, headers=None):
+    return BenchlingError(
+        status_code=status_code,
+        headers=headers or {},
+        json=None,
+        content=None,
+        parsed=None,
+    )
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(throttle.time, "sleep", sleeps.append)
+    return sleeps
+
+
+@pytest.mark.unittest
+def test_retry_after():
+    assert throttle.retry_after({"Retry-After": "3"}) == 3.0
+    assert throttle.retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+    assert throttle.retry_after({}) is None
+
+
+@pytest.mark.unittest
+def test_call_honors_retry_after(no_sleep):
+    fn = MagicMock(
+        side_effect=[benchling_error(429, {"Retry-After": "2"}), "created"]
+    )
+    adaptive = throttle.AdaptiveThrottle(max_concurrency=8)
+
+    assert adaptive.call(fn, location="body") == "created"
+    assert no_sleep == [2.0]
+    assert adaptive.limit == 2  # 4 halved after the 429
+    fn.assert_called_with(location="body")
+
+
+@pytest.mark.unittest
+def test_call_backs_off_on_server_errors(no_sleep):
+    fn = MagicMock(side_effect=[benchling_error(502), benchling_error(503), "created"])
+    adaptive = throttle.AdaptiveThrottle(base_delay=1.0)
+
+    assert adaptive.call(fn) == "created"
+    assert len(no_sleep) == 2
+    assert 0 <= no_sleep[0] <= 1.0 and 0 <= no_sleep[1] <= 2.0
+
+
+@pytest.mark.unittest
+def test_call_does_not_retry_client_errors(no_sleep):
+    fn = MagicMock(side_effect=benchling_error(400))
+
+    with pytest.raises(BenchlingError):
+        throttle.AdaptiveThrottle().call(fn)
+    assert fn.call_count == 1
+    assert no_sleep == []
+
+
+@pytest.mark.unittest
+def test_call_reauthenticates_once_on_unauthorized(no_sleep, monkeypatch):
+    reauthenticate = MagicMock()
+    monkeypatch.setattr(throttle, "_reauthenticate", reauthenticate)
+
+    fn = MagicMock(side_effect=[benchling_error(401), "created"])
+    assert throttle.AdaptiveThrottle().call(fn) == "created"
+
+    fn = MagicMock(side_effect=benchling_error(401))
+    with pytest.raises(BenchlingError):
+        throttle.AdaptiveThrottle().call(fn)
+    assert fn.call_count == 2
+    assert reauthenticate.call_count == 2
+
+
+@pytest.mark.unittest
+def test_call_gives_up_after_max_retries(no_sleep):
+    fn = MagicMock(side_effect=benchling_error(500))
+
+    with pytest.raises(BenchlingError):
+        throttle.AdaptiveThrottle(max_retries=2).call(fn)
+    assert fn.call_count == 3
+
+
+@pytest.mark.unittest
+def test_limit_grows_on_success_up_to_max():
+    adaptive = throttle.AdaptiveThrottle(max_concurrency=3)
+    assert adaptive.limit == 1
+
+    for _ in range(10):
+        adaptive.call(lambda: None)
+    assert adaptive.limit == 3
+    assert adaptive.in_flight == 0
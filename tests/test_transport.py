@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import metrics
+from src import transport
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    transport.close()
+    metrics.reset()
+
+
+@pytest.mark.unittest
+def test_connections_are_reused(server):
+    run_metrics = metrics.reset()
+    client = transport.shared_client(max_connections=4)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: client.get(server).raise_for_status(), range(40)))
+
+    stats = transport.stats()
+    assert stats["hits"] + stats["misses"] == 40
+    assert 1 <= stats["misses"] <= 4  # At most one connection per pool slot
+    assert run_metrics.report()["connections"] == {
+        "reused": stats["hits"],
+        "opened": stats["misses"],
+    }
+
+
+@pytest.mark.unittest
+def test_shared_client_is_sized_once(server):
+    first = transport.shared_client(max_connections=4)
+
+    assert transport.shared_client(max_connections=2) is first
+    assert transport.shared_client(max_connections=8) is first
+    first.get(server).raise_for_status()  # Still open
+
+
+@pytest.mark.unittest
+def test_sessions_share_the_client():
+    from src import inventory_builder
+
+    auth = {"client_id": "id", "client_secret": "secret"}
+    try:
+        first = inventory_builder.create_session("orgdev", auth, max_connections=4)
+        second = inventory_builder.create_session("orgdev", auth, max_connections=4)
+        assert first.client.httpx_client is second.client.httpx_client
+        assert first.client.httpx_client is transport.shared_client(4)
+    finally:
+        transport.close()